@@ -1,9 +1,11 @@
 import random
 
+_ACTIONS = ('fold', 'call', 'raise')
+_rand = random.random
+
 def ai_choose_action(game_state: dict, player_name: str) -> dict:
-    # Basic AI: random action
-    actions = ['fold', 'call', 'raise']
-    action = random.choice(actions)
+    # Basic AI: random action, picked by scaling one random float onto the action table
+    action = _ACTIONS[int(_rand() * 3)]
     amount = None
     if action == 'raise':
         amount = game_state['current_bet'] + 10
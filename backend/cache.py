@@ -0,0 +1,16 @@
+import redis
+import os
+
+REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
+REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+
+redis_client = redis.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    socket_connect_timeout=1,
+    socket_timeout=1,
+)
+
+# Dependency
+def get_redis():
+    return redis_client
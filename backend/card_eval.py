@@ -0,0 +1,182 @@
+"""
+Cactus Kev poker hand evaluator
+
+Every card is packed into a single 32-bit integer:
+
+    xxxbbbbb bbbbbbbb cdhsrrrr xxpppppp
+
+    p = prime number of the rank (deuce=2, trey=3, ..., ace=41)
+    r = rank index (deuce=0, ..., ace=12)
+    cdhs = suit bit
+    b = bit set for the rank of the card
+
+A five card hand is then ranked with a few bitwise operations and a table
+lookup, returning one of the 7462 distinct hand values
+(1 = royal flush, 7462 = 7-5-4-3-2 offsuit). Lower is stronger.
+"""
+import numpy as np
+from itertools import combinations
+from numba import njit, prange
+
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+SUIT_BITS = (0x1000, 0x2000, 0x4000, 0x8000)
+
+# Straights as rank bitmasks, best first (A-high down to the 5-high wheel)
+STRAIGHTS = tuple(0x1F << i for i in range(8, -1, -1)) + (0x100F,)
+
+def encode(rank_index: int, suit_index: int) -> int:
+    """Pack a card into its Cactus Kev integer"""
+    return (1 << (16 + rank_index)) | SUIT_BITS[suit_index] | (rank_index << 8) | PRIMES[rank_index]
+
+# Card id (rank_index * 4 + suit_index) -> Cactus Kev integer
+CARD_INT = np.array([encode(r, s) for r in range(13) for s in range(4)], dtype=np.uint32)
+
+def _build_tables():
+    """Generate the flush, unique-rank and prime-product lookup tables"""
+    flushes = np.zeros(0x2000, dtype=np.uint16)
+    unique5 = np.zeros(0x2000, dtype=np.uint16)
+
+    ranks_desc = range(12, -1, -1)
+
+    # Five distinct ranks, strongest first
+    distinct = [sum(1 << r for r in combo) for combo in combinations(ranks_desc, 5)]
+    high_cards = [mask for mask in distinct if mask not in STRAIGHTS]
+
+    for i, mask in enumerate(STRAIGHTS):
+        flushes[mask] = 1 + i          # straight flushes: 1..10
+        unique5[mask] = 1600 + i       # straights: 1600..1609
+    for i, mask in enumerate(high_cards):
+        flushes[mask] = 323 + i        # flushes: 323..1599
+        unique5[mask] = 6186 + i       # high cards: 6186..7462
+
+    # Hands with at least one pair are keyed by the product of their primes
+    products = []
+    value = 10
+    def add(product):
+        nonlocal value
+        value += 1
+        products.append((product, value))
+
+    for quad in ranks_desc:
+        for kicker in ranks_desc:
+            if kicker != quad:
+                add(PRIMES[quad] ** 4 * PRIMES[kicker])
+    for trips in ranks_desc:
+        for pair in ranks_desc:
+            if pair != trips:
+                add(PRIMES[trips] ** 3 * PRIMES[pair] ** 2)
+    value = 1609
+    for trips in ranks_desc:
+        for k1, k2 in combinations([r for r in ranks_desc if r != trips], 2):
+            add(PRIMES[trips] ** 3 * PRIMES[k1] * PRIMES[k2])
+    for high, low in combinations(ranks_desc, 2):
+        for kicker in ranks_desc:
+            if kicker != high and kicker != low:
+                add(PRIMES[high] ** 2 * PRIMES[low] ** 2 * PRIMES[kicker])
+    for pair in ranks_desc:
+        for k1, k2, k3 in combinations([r for r in ranks_desc if r != pair], 3):
+            add(PRIMES[pair] ** 2 * PRIMES[k1] * PRIMES[k2] * PRIMES[k3])
+
+    products.sort()
+    keys = np.array([p for p, _ in products], dtype=np.int64)
+    values = np.array([v for _, v in products], dtype=np.uint16)
+    return flushes, unique5, keys, values
+
+FLUSHES, UNIQUE5, PRODUCTS, VALUES = _build_tables()
+
+# The 21 ways to pick five of seven cards, as index rows
+_C75 = np.array(list(combinations(range(7), 5)), dtype=np.int8)
+
+@njit(cache=True)
+def eval_5cards(c1, c2, c3, c4, c5):
+    """Rank a five card hand given as Cactus Kev integers"""
+    q = (c1 | c2 | c3 | c4 | c5) >> 16
+    if c1 & c2 & c3 & c4 & c5 & 0xF000:
+        return np.int64(FLUSHES[q])
+    s = UNIQUE5[q]
+    if s:
+        return np.int64(s)
+    product = np.int64(c1 & 0xFF) * (c2 & 0xFF) * (c3 & 0xFF) * (c4 & 0xFF) * (c5 & 0xFF)
+    return np.int64(VALUES[np.searchsorted(PRODUCTS, product)])
+
+@njit(cache=True)
+def eval_7cards(cards):
+    """Rank the best five card hand out of an array of 5-7 Cactus Kev integers"""
+    n = len(cards)
+    if n < 5:
+        raise ValueError("At least 5 cards are needed to rank a hand")
+    best = np.int64(7463)
+    if n == 7:
+        for i in range(21):
+            rank = eval_5cards(cards[_C75[i, 0]], cards[_C75[i, 1]], cards[_C75[i, 2]],
+                               cards[_C75[i, 3]], cards[_C75[i, 4]])
+            if rank < best:
+                best = rank
+        return best
+    for a in range(n - 4):
+        for b in range(a + 1, n - 3):
+            for c in range(b + 1, n - 2):
+                for d in range(c + 1, n - 1):
+                    for e in range(d + 1, n):
+                        rank = eval_5cards(cards[a], cards[b], cards[c], cards[d], cards[e])
+                        if rank < best:
+                            best = rank
+    return best
+
+# Trials per block in mc_equity; each block gets its own seed
+_TRIAL_BLOCK = 64
+
+@njit(cache=True)
+def _mc_trial(stub, need, board, hero, n_opponents):
+    """Deal one random completion and return hero's share of the pot"""
+    n_board = len(board)
+    # Partial Fisher-Yates: only the cards this trial deals get shuffled
+    deck = stub.copy()
+    for i in range(need):
+        j = np.random.randint(i, len(deck))
+        deck[i], deck[j] = deck[j], deck[i]
+
+    cards = np.empty(7, dtype=np.uint32)
+    cards[:n_board] = board
+    cards[n_board:5] = deck[:5 - n_board]
+    cards[5] = hero[0]
+    cards[6] = hero[1]
+    hero_rank = eval_7cards(cards)
+
+    ties = 1
+    for o in range(n_opponents):
+        cards[5] = deck[5 - n_board + 2 * o]
+        cards[6] = deck[6 - n_board + 2 * o]
+        rank = eval_7cards(cards)
+        if rank < hero_rank:
+            return 0.0
+        if rank == hero_rank:
+            ties += 1
+    return 1.0 / ties
+
+@njit(parallel=True, cache=True)
+def mc_equity(hero, board, n_opponents, n_trials, seed=-1):
+    """
+    Estimate hero's share of the pot against n_opponents random hands by
+    dealing out n_trials random completions of the board (ties split).
+    With seed >= 0 the result is reproducible: trials run in fixed blocks,
+    each seeding the RNG of whichever thread runs it, and the block sums
+    are added up in order
+    """
+    n_board = len(board)
+    stub = np.empty(52 - 2 - n_board, dtype=np.uint32)
+    k = 0
+    for card in CARD_INT:
+        if card != hero[0] and card != hero[1] and not (board == card).any():
+            stub[k] = card
+            k += 1
+    need = 5 - n_board + 2 * n_opponents
+
+    n_blocks = (n_trials + _TRIAL_BLOCK - 1) // _TRIAL_BLOCK
+    partial = np.zeros(n_blocks)
+    for b in prange(n_blocks):
+        if seed >= 0:
+            np.random.seed(seed + b)
+        for t in range(b * _TRIAL_BLOCK, min(n_trials, (b + 1) * _TRIAL_BLOCK)):
+            partial[b] += _mc_trial(stub, need, board, hero, n_opponents)
+    return partial.sum() / n_trials
@@ -0,0 +1,57 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+import threading
+
+from . import models
+from .poker_logic import PokerGame, create_poker_game_from_state
+
+# Live games kept in memory between requests, keyed by game id, shared by
+# the HTTP routes and the WebSocket handlers. Postgres is only written on
+# state-changing actions. A game is evicted once its hand ends.
+active_games: Dict[int, PokerGame] = {}
+
+# One lock per game id. The threadpool HTTP routes and the event-loop
+# WebSocket handlers both mutate games, so each holds the lock across the
+# mutation and the snapshot, and never across I/O. Locks outlive eviction:
+# a thread may still be waiting on one, and a reloaded game must share it.
+_game_locks: Dict[int, threading.Lock] = {}
+
+def game_lock(game_id: int) -> threading.Lock:
+    lock = _game_locks.get(game_id)
+    if lock is None:
+        lock = _game_locks.setdefault(game_id, threading.Lock())
+    return lock
+
+def evict_game(game_id: int):
+    """Drop a finished game from memory; the next request reloads it from its row"""
+    with game_lock(game_id):
+        active_games.pop(game_id, None)
+
+def older_state(version: int):
+    """
+    WHERE clause for writing a state snapshot: only replace a stored state
+    with a lower version, so a late write can never roll the row back
+    """
+    return func.coalesce(models.Game.state['version'].as_integer(), -1) < version
+
+def previous_state(version: int):
+    """
+    WHERE clause for a partial write: the stored state must be exactly the
+    one before version, so a patch never lands on a row that missed a write
+    """
+    return models.Game.state['version'].as_integer() == version - 1
+
+def get_live_game(game_id: int, db: Session) -> Optional[PokerGame]:
+    """Return the live PokerGame for game_id, deserializing it from the DB only once (None if there is no such game)"""
+    poker_game = active_games.get(game_id)
+    if poker_game is not None:
+        return poker_game
+    
+    # Only the state column is needed to rebuild the game
+    game = db.query(models.Game.state).filter(models.Game.id == game_id).first()
+    if not game:
+        return None
+    
+    # setdefault: if another thread loaded the same game meanwhile, keep its copy
+    return active_games.setdefault(game_id, create_poker_game_from_state(game.state))
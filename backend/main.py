@@ -1,22 +1,31 @@
-import json
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, BackgroundTasks, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Optional
+from typing import List, Dict, Any, Optional
 from datetime import timedelta
-import json
+from functools import lru_cache
+import os
+import time
 
 from . import models, schemas, database, auth
-from .poker_logic import PokerGame, decide_winner
+from .poker_logic import PokerGame, apply_action, decide_winner
+from .card_eval import CARD_INT, eval_7cards
 from .ai_agent import ai_choose_action
-from database import engine, SessionLocal, get_db
-from auth import get_current_user
-from tournaments import tournament_router
-from ml_models.poker_model import PokerAIModel
-from websockets.handlers import handle_websocket_connection
+from .database import engine, get_db
+from .game_store import active_games, get_live_game, game_lock, evict_game, older_state
+from .tournaments import tournament_router
+from .ml_models.poker_model import BatchPredictor, get_model
+from .websockets.handlers import handle_websocket_connection
 
-app = FastAPI(title="APIPoker Backend", description="Backend API for APIPoker platform")
+__all__ = ["app"]
+
+app = FastAPI(
+    title="APIPoker Backend",
+    description="Backend API for APIPoker platform",
+    default_response_class=ORJSONResponse
+)
 
 # Set up CORS middleware
 app.add_middleware(
@@ -31,19 +40,22 @@ app.add_middleware(
 app.include_router(tournament_router)
 
 # Initialize database
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# The schema is managed by `alembic upgrade head` (run before uvicorn by the
+# container); RUN_MIGRATIONS=1 is a dev-only fallback that lets a single
+# worker create missing tables itself on startup
+@app.on_event("startup")
+def init_schema():
+    if os.getenv("RUN_MIGRATIONS") == "1":
+        models.Base.metadata.create_all(bind=engine)
 
 # Initialize ML model for AI
-ai_model = PokerAIModel()
+ai_model = get_model()
+ai_predictor = BatchPredictor(ai_model)
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+def warm_hand_evaluator():
+    # Compile the JIT evaluator now so the first showdown doesn't pay for it
+    eval_7cards(CARD_INT[:7])
 
 # --- Auth Routes ---
 @app.post("/register", response_model=schemas.UserOut)
@@ -107,11 +119,11 @@ def create_game(game: schemas.GameCreate, db: Session = Depends(get_db),
     poker_game = PokerGame(players=[current_user.username, "ai_player"])
     
     # Save the game state
-    game_state = json.dumps(poker_game.to_dict())
-    db_game = models.Game(table_id=game.table_id, owner_id=current_user.id, state=game_state)
+    db_game = models.Game(table_id=game.table_id, owner_id=current_user.id, state=poker_game.to_dict())
     db.add(db_game)
     db.commit()
     db.refresh(db_game)
+    active_games[db_game.id] = poker_game
     return db_game
 
 @app.get("/games/{game_id}", response_model=schemas.GameOut)
@@ -119,179 +131,144 @@ def get_game(game_id: int, db: Session = Depends(get_db)):
     game = db.query(models.Game).filter(models.Game.id == game_id).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
+    # The cached game may be ahead of the row while a flush is pending
+    if game_id in active_games:
+        return schemas.GameOut(
+            id=game.id,
+            table_id=game.table_id,
+            owner_id=game.owner_id,
+            state=active_games[game_id].to_dict()
+        )
     return game
 
+def load_game(game_id: int, db: Session) -> PokerGame:
+    """Return the live PokerGame for game_id, or 404"""
+    poker_game = get_live_game(game_id, db)
+    if poker_game is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return poker_game
+
+def persist_game(game_id: int, state: Dict[str, Any]):
+    """
+    Write a game's state back to Postgres (runs as a background task).
+    Tasks for back-to-back requests can finish out of order, so an older
+    snapshot never overwrites a newer one
+    """
+    db = database.SessionLocal()
+    try:
+        db.query(models.Game).filter(models.Game.id == game_id, older_state(state['version'])).update(
+            {models.Game.state: state},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
 # --- Poker Game Actions ---
 @app.post("/games/{game_id}/action")
-def player_action(game_id: int, action: str, amount: Optional[int] = None, 
+def player_action(game_id: int, action: str, background_tasks: BackgroundTasks,
+                 amount: Optional[int] = None,
                  db: Session = Depends(get_db),
                  current_user: models.User = Depends(auth.get_current_user)):
-    # Get the game
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    # Parse the current game state
-    game_state = json.loads(game.state)
-    poker_game = PokerGame(game_state['players'])
-    poker_game.hands = {p: [poker_game.Card(c[-1], c[:-1]) for c in game_state['hands'][p]] for p in game_state['players']}
-    poker_game.community = [poker_game.Card(c[-1], c[:-1]) for c in game_state['community']]
-    poker_game.pot = game_state['pot']
-    poker_game.current_bet = game_state['current_bet']
-    poker_game.active_players = set(game_state['active_players'])
-    poker_game.bets = game_state['bets']
-    
-    # Process player action
-    if current_user.username not in poker_game.active_players:
-        raise HTTPException(status_code=400, detail="Player not active")
+    poker_game = load_game(game_id, db)
+    
+    with game_lock(game_id):
+        # Process player action
+        if not poker_game.is_active(current_user.username):
+            raise HTTPException(status_code=400, detail="Player not active")
+            
+        try:
+            apply_action(poker_game, current_user.username, action, amount)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-    if action == 'fold':
-        poker_game.active_players.remove(current_user.username)
-    elif action == 'call':
-        bet = poker_game.current_bet - poker_game.bets[current_user.username]
-        poker_game.bets[current_user.username] += bet
-        poker_game.pot += bet
-    elif action == 'raise':
-        if amount is None or amount <= poker_game.current_bet:
-            raise HTTPException(status_code=400, detail="Invalid raise amount")
-        bet = amount - poker_game.bets[current_user.username]
-        poker_game.current_bet = amount
-        poker_game.bets[current_user.username] += bet
-        poker_game.pot += bet
-    else:
-        raise HTTPException(status_code=400, detail="Unknown action")
-    
-    # AI's turn
-    if "ai_player" in poker_game.active_players:
-        ai_decision = ai_choose_action(poker_game.to_dict(), "ai_player")
-        ai_action = ai_decision['action']
+        # AI's turn
+        if poker_game.is_active("ai_player"):
+            ai_decision = ai_choose_action(poker_game.to_dict(), "ai_player")
+            apply_action(poker_game, "ai_player", ai_decision['action'], ai_decision['amount'])
         
-        if ai_action == 'fold':
-            poker_game.active_players.remove("ai_player")
-        elif ai_action == 'call':
-            bet = poker_game.current_bet - poker_game.bets["ai_player"]
-            poker_game.bets["ai_player"] += bet
-            poker_game.pot += bet
-        elif ai_action == 'raise':
-            amount = ai_decision['amount']
-            bet = amount - poker_game.bets["ai_player"]
-            poker_game.current_bet = amount
-            poker_game.bets["ai_player"] += bet
-            poker_game.pot += bet
+        state = poker_game.snapshot()
     
-    # Update game state in DB
-    game.state = json.dumps(poker_game.to_dict())
-    db.commit()
+    # Persist game state after the response has been sent
+    background_tasks.add_task(persist_game, game_id, state)
     
-    return {"message": "Action processed", "state": poker_game.to_dict()}
+    return {"message": "Action processed", "state": state}
 
 @app.post("/games/{game_id}/flop")
-def deal_flop(game_id: int, db: Session = Depends(get_db),
+def deal_flop(game_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db),
              current_user: models.User = Depends(auth.get_current_user)):
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    # Parse game state
-    game_state = json.loads(game.state)
-    poker_game = PokerGame(game_state['players'])
-    poker_game.hands = {p: [poker_game.Card(c[-1], c[:-1]) for c in game_state['hands'][p]] for p in game_state['players']}
-    poker_game.community = [poker_game.Card(c[-1], c[:-1]) for c in game_state['community']]
-    poker_game.pot = game_state['pot']
-    poker_game.current_bet = game_state['current_bet']
-    poker_game.active_players = set(game_state['active_players'])
-    poker_game.bets = game_state['bets']
+    poker_game = load_game(game_id, db)
     
     # Deal flop
-    poker_game.flop()
+    with game_lock(game_id):
+        poker_game.flop()
+        state = poker_game.snapshot()
     
-    # Update game state
-    game.state = json.dumps(poker_game.to_dict())
-    db.commit()
+    # Persist game state after the response has been sent
+    background_tasks.add_task(persist_game, game_id, state)
     
-    return {"message": "Flop dealt", "state": poker_game.to_dict()}
+    return {"message": "Flop dealt", "state": state}
 
 @app.post("/games/{game_id}/turn")
-def deal_turn(game_id: int, db: Session = Depends(get_db),
+def deal_turn(game_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db),
              current_user: models.User = Depends(auth.get_current_user)):
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    # Parse game state
-    game_state = json.loads(game.state)
-    poker_game = PokerGame(game_state['players'])
-    poker_game.hands = {p: [poker_game.Card(c[-1], c[:-1]) for c in game_state['hands'][p]] for p in game_state['players']}
-    poker_game.community = [poker_game.Card(c[-1], c[:-1]) for c in game_state['community']]
-    poker_game.pot = game_state['pot']
-    poker_game.current_bet = game_state['current_bet']
-    poker_game.active_players = set(game_state['active_players'])
-    poker_game.bets = game_state['bets']
+    poker_game = load_game(game_id, db)
     
     # Deal turn
-    poker_game.turn()
+    with game_lock(game_id):
+        poker_game.turn()
+        state = poker_game.snapshot()
     
-    # Update game state
-    game.state = json.dumps(poker_game.to_dict())
-    db.commit()
+    # Persist game state after the response has been sent
+    background_tasks.add_task(persist_game, game_id, state)
     
-    return {"message": "Turn dealt", "state": poker_game.to_dict()}
+    return {"message": "Turn dealt", "state": state}
 
 @app.post("/games/{game_id}/river")
-def deal_river(game_id: int, db: Session = Depends(get_db),
+def deal_river(game_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db),
               current_user: models.User = Depends(auth.get_current_user)):
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    # Parse game state
-    game_state = json.loads(game.state)
-    poker_game = PokerGame(game_state['players'])
-    poker_game.hands = {p: [poker_game.Card(c[-1], c[:-1]) for c in game_state['hands'][p]] for p in game_state['players']}
-    poker_game.community = [poker_game.Card(c[-1], c[:-1]) for c in game_state['community']]
-    poker_game.pot = game_state['pot']
-    poker_game.current_bet = game_state['current_bet']
-    poker_game.active_players = set(game_state['active_players'])
-    poker_game.bets = game_state['bets']
+    poker_game = load_game(game_id, db)
     
     # Deal river
-    poker_game.river()
+    with game_lock(game_id):
+        poker_game.river()
+        state = poker_game.snapshot()
     
-    # Update game state
-    game.state = json.dumps(poker_game.to_dict())
-    db.commit()
+    # Persist game state after the response has been sent
+    background_tasks.add_task(persist_game, game_id, state)
     
-    return {"message": "River dealt", "state": poker_game.to_dict()}
+    return {"message": "River dealt", "state": state}
 
 @app.post("/games/{game_id}/showdown")
 def showdown(game_id: int, db: Session = Depends(get_db),
             current_user: models.User = Depends(auth.get_current_user)):
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    poker_game = load_game(game_id, db)
     
-    # Parse game state
-    game_state = json.loads(game.state)
-    poker_game = PokerGame(game_state['players'])
-    poker_game.hands = {p: [poker_game.Card(c[-1], c[:-1]) for c in game_state['hands'][p]] for p in game_state['players']}
-    poker_game.community = [poker_game.Card(c[-1], c[:-1]) for c in game_state['community']]
-    poker_game.pot = game_state['pot']
-    poker_game.current_bet = game_state['current_bet']
-    poker_game.active_players = set(game_state['active_players'])
-    poker_game.bets = game_state['bets']
-    
-    # Find winners
-    winners = decide_winner(poker_game)
+    # Complete the board, then find winners
+    with game_lock(game_id):
+        poker_game.run_out()
+        winners = decide_winner(poker_game)
+        
+        # Distribute pot
+        pot_per_winner = poker_game.pot / len(winners) if winners else 0.0
+        state = poker_game.snapshot()
+    
+    # The final state and the payouts go in one transaction
+    db.query(models.Game).filter(models.Game.id == game_id, older_state(state['version'])).update(
+        {models.Game.state: state},
+        synchronize_session=False
+    )
     
-    # Distribute pot
-    pot_per_winner = poker_game.pot / len(winners)
+    # Credit every winner in a single UPDATE (AI seats have no user row)
+    if winners:
+        db.query(models.User).filter(models.User.username.in_(winners)).update(
+            {models.User.credits: models.User.credits + pot_per_winner},
+            synchronize_session=False
+        )
+    db.commit()
     
-    # Credit winners
-    for winner in winners:
-        if winner == current_user.username:
-            user = db.query(models.User).filter(models.User.id == current_user.id).first()
-            user.credits += pot_per_winner
-            db.commit()
+    # The hand is over: the row is now the only copy
+    evict_game(game_id)
     
     return {"message": "Showdown completed", "winners": winners, "pot_per_winner": pot_per_winner}
 
@@ -300,10 +277,9 @@ def showdown(game_id: int, db: Session = Depends(get_db),
 async def websocket_endpoint(
     websocket: WebSocket, 
     game_id: str, 
-    username: str,
-    db: Session = Depends(get_db)
+    username: str
 ):
-    await handle_websocket_connection(websocket, game_id, username, db)
+    await handle_websocket_connection(websocket, game_id, username)
 
 # AI Action endpoint - use ML model for decision making
 @app.get("/ai/action/{game_id}/{ai_name}")
@@ -312,16 +288,18 @@ async def ai_action(
     ai_name: str,
     db: Session = Depends(get_db)
 ):
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    # Parse game state
-    import json
-    game_state = json.loads(game.state)
+    if game_id in active_games:
+        game_state = active_games[game_id].to_dict()
+    else:
+        game = db.query(models.Game.state).filter(models.Game.id == game_id).first()
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
+        game_state = game.state
+    if ai_name not in game_state["hands"]:
+        raise HTTPException(status_code=404, detail="Player not found in game")
     
-    # Get AI decision using ML model
-    decision = ai_model.predict_action(game_state, ai_name)
+    # Get AI decision using ML model, batched with other pending decisions off the event loop
+    decision = await ai_predictor.predict(game_state, ai_name)
     
     return {
         "action": decision["action"],
@@ -329,52 +307,50 @@ async def ai_action(
         "ai_name": ai_name
     }
 
+# Leaderboard results are reused for this many seconds; ranks change slowly
+LEADERBOARD_TTL = 5
+
+@lru_cache(maxsize=64)
+def _leaderboard(time_period: str, limit: int, ttl_bucket: int):
+    """Top users by rank points; ttl_bucket rolls over every LEADERBOARD_TTL seconds"""
+    from sqlalchemy import desc
+    from datetime import datetime, timedelta
+    
+    db = database.SessionLocal()
+    try:
+        query = db.query(
+            models.User.id.label("user_id"),
+            models.User.username,
+            models.User.tournaments_played,
+            models.User.tournaments_won,
+            models.User.total_winnings,
+            models.User.rank_points
+        )
+        
+        # Apply time period filter if needed
+        if time_period == "month":
+            # Logic for monthly leaderboard
+            month_ago = datetime.now() - timedelta(days=30)
+            query = query.filter(models.User.created_at >= month_ago)
+        elif time_period == "week":
+            # Logic for weekly leaderboard
+            week_ago = datetime.now() - timedelta(days=7)
+            query = query.filter(models.User.created_at >= week_ago)
+        
+        # Get results ordered by rank points
+        return query.order_by(desc(models.User.rank_points)).limit(limit).all()
+    finally:
+        db.close()
+
 # Add leaderboard endpoint
 @app.get("/leaderboard", response_model=List[schemas.LeaderboardEntry])
-async def get_leaderboard(
+def get_leaderboard(
     time_period: str = "all",  # all, month, week
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    limit: int = 10
 ):
-    from sqlalchemy import func, desc
-    from datetime import datetime, timedelta
-    
-    query = db.query(
-        models.User.id,
-        models.User.username,
-        models.User.tournaments_played,
-        models.User.tournaments_won,
-        models.User.total_winnings,
-        models.User.rank_points
-    )
-    
-    # Apply time period filter if needed
-    if time_period == "month":
-        # Logic for monthly leaderboard
-        month_ago = datetime.now() - timedelta(days=30)
-        query = query.filter(models.User.created_at >= month_ago)
-    elif time_period == "week":
-        # Logic for weekly leaderboard
-        week_ago = datetime.now() - timedelta(days=7)
-        query = query.filter(models.User.created_at >= week_ago)
-    
-    # Get results ordered by rank points
-    users = query.order_by(desc(models.User.rank_points)).limit(limit).all()
-    
-    # Format results
-    result = []
-    for user in users:
-        result.append({
-            "user_id": user.id,
-            "username": user.username,
-            "tournaments_played": user.tournaments_played,
-            "tournaments_won": user.tournaments_won,
-            "total_winnings": float(user.total_winnings),
-            "rank_points": user.rank_points
-        })
-    
-    return result
+    # Rows are serialized straight through the response model
+    return _leaderboard(time_period, limit, int(time.monotonic() // LEADERBOARD_TTL))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", ws_per_message_deflate=False)
@@ -0,0 +1,119 @@
+"""Initial schema
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# The tables as they were before the first migration; later revisions take them
+# to the current models (games.state starts as a JSON string, see 0001)
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('username', sa.String, nullable=False),
+        sa.Column('hashed_password', sa.String, nullable=False),
+        sa.Column('credits', sa.Float),
+        sa.Column('is_active', sa.Boolean),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('tournaments_played', sa.Integer),
+        sa.Column('tournaments_won', sa.Integer),
+        sa.Column('total_winnings', sa.Float),
+        sa.Column('rank_points', sa.Integer),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table(
+        'tables',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('name', sa.String, nullable=False, unique=True),
+        sa.Column('owner_id', sa.Integer, sa.ForeignKey('users.id')),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_tables_id', 'tables', ['id'])
+
+    op.create_table(
+        'tournaments',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('name', sa.String, nullable=False),
+        sa.Column('description', sa.String, nullable=True),
+        sa.Column('buy_in', sa.Float),
+        sa.Column('prize_pool', sa.Float),
+        sa.Column('start_time', sa.DateTime(timezone=True)),
+        sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('status', sa.String),
+        sa.Column('max_players', sa.Integer),
+        sa.Column('blind_increase_minutes', sa.Integer),
+        sa.Column('initial_stack', sa.Integer),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('created_by_id', sa.Integer, sa.ForeignKey('users.id')),
+    )
+    op.create_index('ix_tournaments_id', 'tournaments', ['id'])
+
+    op.create_table(
+        'tournament_rounds',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('tournament_id', sa.Integer, sa.ForeignKey('tournaments.id')),
+        sa.Column('round_number', sa.Integer),
+        sa.Column('small_blind', sa.Integer),
+        sa.Column('big_blind', sa.Integer),
+        sa.Column('status', sa.String),
+        sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_tournament_rounds_id', 'tournament_rounds', ['id'])
+
+    op.create_table(
+        'tournament_tables',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('tournament_id', sa.Integer, sa.ForeignKey('tournaments.id')),
+        sa.Column('round_id', sa.Integer, sa.ForeignKey('tournament_rounds.id')),
+        sa.Column('table_number', sa.Integer),
+        sa.Column('status', sa.String),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_tournament_tables_id', 'tournament_tables', ['id'])
+
+    op.create_table(
+        'games',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('table_id', sa.Integer, sa.ForeignKey('tables.id')),
+        sa.Column('owner_id', sa.Integer, sa.ForeignKey('users.id')),
+        sa.Column('state', sa.String),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('tournament_table_id', sa.Integer, sa.ForeignKey('tournament_tables.id'), nullable=True),
+        sa.Column('is_tournament_game', sa.Boolean),
+    )
+    op.create_index('ix_games_id', 'games', ['id'])
+
+    op.create_table(
+        'tournament_participants',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('tournament_id', sa.Integer, sa.ForeignKey('tournaments.id')),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id')),
+        sa.Column('status', sa.String),
+        sa.Column('final_position', sa.Integer, nullable=True),
+        sa.Column('chips', sa.Integer),
+        sa.Column('points_earned', sa.Integer),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_tournament_participants_id', 'tournament_participants', ['id'])
+
+def downgrade():
+    op.drop_table('tournament_participants')
+    op.drop_table('games')
+    op.drop_table('tournament_tables')
+    op.drop_table('tournament_rounds')
+    op.drop_table('tournaments')
+    op.drop_table('tables')
+    op.drop_table('users')
@@ -0,0 +1,18 @@
+"""Store game state as JSONB
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = '0001'
+down_revision = '0000'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("ALTER TABLE games ALTER COLUMN state TYPE jsonb USING state::jsonb")
+
+def downgrade():
+    op.execute("ALTER TABLE games ALTER COLUMN state TYPE varchar USING state::text")
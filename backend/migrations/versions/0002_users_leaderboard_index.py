@@ -0,0 +1,29 @@
+"""Composite leaderboard index on users
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # CONCURRENTLY can't run inside a transaction, but avoids locking users while building
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_rank_points', table_name='users', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'ix_users_rank_points_created',
+            'users',
+            [sa.text('rank_points DESC'), 'created_at'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_rank_points_created', table_name='users', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,43 @@
+"""Leaderboard and per-tournament indexes on tournament_participants
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tournament_participants_user_final',
+            'tournament_participants',
+            ['user_id', 'final_position'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Both lead with tournament_id, so they also serve plain per-tournament lookups
+        op.create_index(
+            'ix_tournament_participants_tournament_status',
+            'tournament_participants',
+            ['tournament_id', 'status'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tournament_participants_tournament_user',
+            'tournament_participants',
+            ['tournament_id', 'user_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tournament_participants_tournament_user', table_name='tournament_participants', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tournament_participants_tournament_status', table_name='tournament_participants', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tournament_participants_user_final', table_name='tournament_participants', postgresql_concurrently=True, if_exists=True)
@@ -1,8 +1,96 @@
 import numpy as np
 import joblib
 import os
+import asyncio
+from numba import njit
+
+# Route RandomForest fit/predict through oneDAL when scikit-learn-intelex is installed
+try:
+    from sklearnex import patch_sklearn
+    patch_sklearn()
+except ImportError:
+    pass
+
 from sklearn.ensemble import RandomForestClassifier
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+from ..card_eval import CARD_INT, mc_equity
+from ..poker_logic import CARD_STR
+
+# Card string -> rank value (2..14); unknown/hidden cards count as 0
+CARD_RANK = {c: i // 4 + 2 for i, c in enumerate(CARD_STR)}
+
+@njit(cache=True)
+def _strength_kernel(player_ranks, community_ranks):
+    """Hand strength heuristic over rank values, clamped to 0.0-1.0"""
+    # Basic strength is average of your cards / maximum possible (pair of aces)
+    strength = player_ranks.sum() / 28.0  # 28 = 14+14 (pair of aces)
+    
+    # Bonus for pairs
+    if len(player_ranks) == 2 and player_ranks[0] == player_ranks[1]:
+        strength += 0.3
+    
+    # Bonus for each hole card matching the board
+    for i in range(len(player_ranks)):
+        for j in range(len(community_ranks)):
+            if player_ranks[i] == community_ranks[j]:
+                strength += 0.1
+                break
+    
+    return min(max(strength, 0.0), 1.0)
+
+# Compile at import so the first AI decision doesn't pay the JIT cost
+_strength_kernel(np.zeros(2, dtype=np.int8), np.zeros(0, dtype=np.int8))
+
+@njit(cache=True)
+def _forest_predict(X, roots, left, right, feature, threshold, leaf_proba):
+    """Average leaf class probabilities over every tree and return the winning class index per row"""
+    out = np.empty(X.shape[0], dtype=np.int64)
+    for i in range(X.shape[0]):
+        acc = np.zeros(leaf_proba.shape[1])
+        for t in range(roots.shape[0]):
+            node = roots[t]
+            while left[node] != -1:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            acc += leaf_proba[node]
+        out[i] = np.argmax(acc)
+    return out
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous node arrays
+    and traversed by a numba kernel; predicts the same classes as
+    forest.predict without sklearn's per-call Python overhead
+    """
+    def __init__(self, forest: RandomForestClassifier):
+        roots, left, right, feature, threshold, leaf_proba = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(tree.feature)
+            threshold.append(tree.threshold)
+            value = tree.value[:, 0, :]
+            leaf_proba.append(value / value.sum(axis=1, keepdims=True))
+            offset += tree.node_count
+        
+        self.classes = forest.classes_
+        self.roots = np.array(roots, dtype=np.int64)
+        self.left = np.concatenate(left).astype(np.int64)
+        self.right = np.concatenate(right).astype(np.int64)
+        self.feature = np.concatenate(feature).astype(np.int64)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.leaf_proba = np.concatenate(leaf_proba).astype(np.float64)
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        idx = _forest_predict(X, self.roots, self.left, self.right, self.feature, self.threshold, self.leaf_proba)
+        return self.classes[idx]
 
 class PokerAIModel:
     """
@@ -11,7 +99,9 @@ class PokerAIModel:
     """
     def __init__(self):
         self.model = None
-        self.model_path = os.path.join(os.path.dirname(__file__), 'poker_rf_model.joblib')
+        self.predictor = None
+        # Trained on first use; AI_MODEL_PATH keeps it out of the source tree
+        self.model_path = os.getenv('AI_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'poker_rf_model.joblib'))
         self.load_or_create_model()
         
     def load_or_create_model(self):
@@ -25,6 +115,9 @@ class PokerAIModel:
             # We'll train with sample data initially
             self._initial_training()
             joblib.dump(self.model, self.model_path)
+        self.predictor = CompiledForest(self.model)
+        # Compile the traversal kernel and touch the node arrays before the first real decision
+        self.predictor.predict(np.zeros((1, 6), dtype=np.float32))
     
     def _initial_training(self):
         """Train with initial sample data"""
@@ -41,7 +134,44 @@ class PokerAIModel:
         # 0=fold, 1=call, 2=raise
         y_sample = np.array([2, 0, 1, 2, 0])
         
-        self.model.fit(X_sample, y_sample)
+        X_sim, y_sim = self.generate_training_data()
+        self.model.fit(np.vstack([X_sample, X_sim]), np.concatenate([y_sample, y_sim]))
+    
+    def generate_training_data(self, n_samples: int = 2000, n_trials: int = 200, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Deal random spots and label each with the action its Monte-Carlo
+        equity supports: fold below the pot odds, raise when well ahead of
+        an even share of the pot, otherwise call. The same seed gives the
+        same data
+        """
+        rng = np.random.default_rng(seed)
+        X = np.empty((n_samples, 6))
+        y = np.empty(n_samples, dtype=np.int64)
+        
+        for i in range(n_samples):
+            n_players = int(rng.integers(2, 7))
+            n_board = int(rng.choice([0, 3, 4, 5]))
+            cards = rng.choice(52, 2 + n_board, replace=False)
+            hero, board = cards[:2], cards[2:]
+            
+            # Seeded from rng too, so the same seed gives the same labels
+            equity = mc_equity(CARD_INT[hero], CARD_INT[board], n_players - 1, n_trials, int(rng.integers(2 ** 31)))
+            
+            pot = float(rng.integers(20, 600))
+            current_bet = float(rng.integers(0, 120))
+            player_chips = float(rng.integers(400, 1000))
+            hand_strength = self.evaluate_hand_strength([CARD_STR[c] for c in hero], [CARD_STR[c] for c in board])
+            X[i] = [pot, current_bet, player_chips, hand_strength, n_board, n_players]
+            
+            pot_odds = current_bet / (pot + current_bet) if current_bet else 0.0
+            if equity < pot_odds:
+                y[i] = 0
+            elif equity > 1.5 / n_players:
+                y[i] = 2
+            else:
+                y[i] = 1
+        
+        return X, y
     
     def evaluate_hand_strength(self, player_hand: List[str], community: List[str]) -> float:
         """
@@ -50,60 +180,43 @@ class PokerAIModel:
         """
         # Simplified evaluation for MVP
         # This would be replaced by a more robust evaluation using actual hand rankings
-        hand_ranks = {'2':2, '3':3, '4':4, '5':5, '6':6, '7':7, '8':8, '9':9, '10':10, 'J':11, 'Q':12, 'K':13, 'A':14}
-        
-        # Extract just the ranks
-        player_ranks = [card[:-1] for card in player_hand]
-        community_ranks = [card[:-1] for card in community] if community else []
-        
-        # Convert ranks to values
-        player_values = [hand_ranks.get(rank, 0) for rank in player_ranks]
-        
-        # Basic strength is average of your cards / maximum possible (pair of aces)
-        strength = sum(player_values) / 28.0  # 28 = 14+14 (pair of aces)
-        
-        # Bonus for pairs
-        if len(player_ranks) == 2 and player_ranks[0] == player_ranks[1]:
-            strength += 0.3
-        
-        # If we have community cards, add bonus for matching
-        if community_ranks:
-            for p_rank in player_ranks:
-                if p_rank in community_ranks:
-                    strength += 0.1
-        
-        return min(max(strength, 0.0), 1.0)  # Ensure between 0 and 1
+        player_ranks = np.array([CARD_RANK.get(card, 0) for card in player_hand], dtype=np.int8)
+        community_ranks = np.array([CARD_RANK.get(card, 0) for card in community], dtype=np.int8)
+        return float(_strength_kernel(player_ranks, community_ranks))
     
-    def predict_action(self, game_state: Dict[str, Any], player_name: str) -> Dict[str, Any]:
-        """Predict best action (fold, call, raise) based on game state"""
-        # Extract player's hand
-        player_hand = game_state['hands'][player_name]
+    def _table_features(self, game_state: Dict[str, Any]) -> Tuple[np.ndarray, int, int, int, int]:
+        """The parts of a feature row shared by every player at the table, plus the board's ranks"""
         community = game_state['community']
+        community_ranks = np.array([CARD_RANK.get(card, 0) for card in community], dtype=np.int8)
+        return community_ranks, game_state['pot'], game_state['current_bet'], len(community), len(game_state['active_players'])
+    
+    def _feature_row(self, table: Tuple[np.ndarray, int, int, int, int], game_state: Dict[str, Any], player_name: str) -> List[float]:
+        """One player's feature row; the single definition of the model's input layout"""
+        community_ranks, pot, current_bet, community_cards_count, active_players_count = table
         
         # Calculate hand strength
-        hand_strength = self.evaluate_hand_strength(player_hand, community)
+        player_ranks = np.array([CARD_RANK.get(card, 0) for card in game_state['hands'][player_name]], dtype=np.int8)
+        hand_strength = float(_strength_kernel(player_ranks, community_ranks))
         
-        # Extract features for prediction
-        pot = game_state['pot']
-        current_bet = game_state['current_bet']
         player_chips = 1000 - game_state['bets'][player_name]  # Assuming starting chips = 1000
-        community_cards_count = len(community)
-        active_players_count = len(game_state['active_players'])
         
-        # Feature vector
-        features = np.array([[
+        return [
             pot, 
             current_bet, 
             player_chips, 
             hand_strength,
             community_cards_count, 
             active_players_count
-        ]])
-        
-        # Predict action (0=fold, 1=call, 2=raise)
-        action_code = self.model.predict(features)[0]
+        ]
+    
+    def _extract_features(self, game_state: Dict[str, Any], player_name: str) -> List[float]:
+        """Build the model's feature vector for one player"""
+        return self._feature_row(self._table_features(game_state), game_state, player_name)
+    
+    def _to_action(self, action_code: int, features: List[float]) -> Dict[str, Any]:
+        """Convert a predicted action code (0=fold, 1=call, 2=raise) to an action dict"""
+        _, current_bet, player_chips, hand_strength, _, _ = features
         
-        # Convert to action dict
         if action_code == 0:
             return {'action': 'fold', 'amount': None}
         elif action_code == 1:
@@ -120,6 +233,29 @@ class PokerAIModel:
             
             return {'action': 'raise', 'amount': amount}
     
+    def predict_actions(self, requests: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """Predict actions for several (game_state, player_name) pairs with a single model call"""
+        return self.predict_rows([self._extract_features(game_state, player_name) for game_state, player_name in requests])
+    
+    def predict_rows(self, rows: List[List[float]]) -> List[Dict[str, Any]]:
+        """Predict actions for already extracted feature rows with a single model call"""
+        # Trees split on float32, so building the matrix in that dtype avoids a conversion copy
+        X = np.empty((len(rows), 6), dtype=np.float32)
+        for i, row in enumerate(rows):
+            X[i] = row
+        
+        action_codes = self.predictor.predict(X)
+        return [self._to_action(code, row) for code, row in zip(action_codes, rows)]
+    
+    def predict_actions_batch(self, game_state: Dict[str, Any], player_names: List[str]) -> List[Dict[str, Any]]:
+        """Predict actions for several players at one table, computing the table-wide features once"""
+        table = self._table_features(game_state)
+        return self.predict_rows([self._feature_row(table, game_state, player_name) for player_name in player_names])
+    
+    def predict_action(self, game_state: Dict[str, Any], player_name: str) -> Dict[str, Any]:
+        """Predict best action (fold, call, raise) based on game state"""
+        return self.predict_actions([(game_state, player_name)])[0]
+    
     def update_model(self, game_history: List[Dict[str, Any]]):
         """Update model with new game data (for online learning)"""
         # Extract features and outcomes from game history
@@ -137,5 +273,82 @@ class PokerAIModel:
             X_new = np.array(X_new)
             y_new = np.array(y_new)
             self.model.fit(X_new, y_new)
+            self.predictor = CompiledForest(self.model)
             # Save updated model
             joblib.dump(self.model, self.model_path)
+
+
+_instance = None
+
+def get_model() -> PokerAIModel:
+    """Shared PokerAIModel, loaded once per process"""
+    global _instance
+    if _instance is None:
+        _instance = PokerAIModel()
+    return _instance
+
+
+class BatchPredictor:
+    """
+    Collects AI decisions requested within a short window and runs them
+    through the model as one batch in a worker thread, so inference never
+    blocks the event loop
+    """
+    def __init__(self, model: PokerAIModel, window: float = 0.005, max_batch: int = 16):
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = None
+        self.worker = None
+    
+    async def predict(self, game_state: Dict[str, Any], player_name: str) -> Dict[str, Any]:
+        """Queue a decision and wait for the batch it lands in"""
+        if self.worker is None:
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((game_state, player_name, future))
+        return await future
+    
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            
+            # Give concurrent requests a moment to join this batch
+            await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            
+            try:
+                results = await asyncio.to_thread(self._predict_batch, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+    
+    def _predict_batch(self, batch) -> List[Any]:
+        """
+        A decision or an exception per request. Features are extracted one
+        request at a time so a bad request (e.g. an unknown player) fails only
+        its own future, then the valid rows go through the model together
+        """
+        results: List[Any] = [None] * len(batch)
+        rows, valid = [], []
+        for i, (game_state, player_name, _) in enumerate(batch):
+            try:
+                rows.append(self.model._extract_features(game_state, player_name))
+                valid.append(i)
+            except Exception as e:
+                results[i] = e
+        
+        if rows:
+            for i, decision in zip(valid, self.model.predict_rows(rows)):
+                results[i] = decision
+        return results
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -21,6 +22,11 @@ class User(Base):
     
     # Tournament relationships
     created_tournaments = relationship('Tournament', back_populates='created_by', foreign_keys='Tournament.created_by_id')
+    
+    # Serves the leaderboard's ORDER BY rank_points DESC LIMIT n (with optional created_at filter)
+    __table_args__ = (
+        Index('ix_users_rank_points_created', rank_points.desc(), created_at),
+    )
 
 class Table(Base):
     __tablename__ = 'tables'
@@ -36,7 +42,7 @@ class Game(Base):
     id = Column(Integer, primary_key=True, index=True)
     table_id = Column(Integer, ForeignKey('tables.id'))
     owner_id = Column(Integer, ForeignKey('users.id'))
-    state = Column(String)  # JSON string of game state
+    state = Column(JSONB)  # Game state as stored by PokerGame.to_dict()
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     table = relationship('Table', back_populates='games')
     owner = relationship('User', back_populates='games')
@@ -1,78 +1,216 @@
-import random
-from typing import List, Dict, Any
+import numpy as np
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+from .card_eval import CARD_INT, eval_7cards
 
 SUITS = ['♠', '♥', '♦', '♣']
 RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
 
-class Card:
-    def __init__(self, suit: str, rank: str):
-        self.suit = suit
-        self.rank = rank
-    def __repr__(self):
-        return f'{self.rank}{self.suit}'
-    def __str__(self):
-        return f'{self.rank}{self.suit}'
+# A card is an int 0..51 (rank index * 4 + suit index), the same ids card_eval.CARD_INT
+# is indexed by; strings are only produced when a game is serialized
+CARD_STR = tuple(f'{r}{s}' for r in RANKS for s in SUITS)
+CARD_BY_STR = {c: i for i, c in enumerate(CARD_STR)}
+
+_rng = np.random.default_rng()
 
 class Deck:
+    """Shuffled card ids dealt from a cursor"""
+    __slots__ = ('cards', 'idx')
     def __init__(self):
-        self.cards = [Card(s, r) for s in SUITS for r in RANKS]
-        random.shuffle(self.cards)
-    def draw(self, n=1):
-        return [self.cards.pop() for _ in range(n)]
+        # One numpy permutation, then plain ints: slicing a small list beats slicing an array
+        self.cards = _rng.permutation(52).tolist()
+        self.idx = 0
+    def draw(self, n=1) -> List[int]:
+        ids = self.cards[self.idx:self.idx + n]
+        self.idx += n
+        return ids
+    def discard(self, cards: List[int]):
+        """Remove cards that are already in play (used when restoring a saved game)"""
+        in_play = set(cards)
+        self.cards = [c for c in self.cards[self.idx:] if c not in in_play]
+        self.idx = 0
 
 class PokerGame:
+    # One instance lives per table for the whole game: no per-instance __dict__
+    __slots__ = ('players', 'player_index', 'hands', 'deck', 'community', 'pot', 'current_bet',
+                 'active_mask', 'bets', 'version', '_hand_strs', '_community_strs')
     def __init__(self, players: List[str]):
         self.players = players
-        self.hands: Dict[str, List[Card]] = {p: [] for p in players}
+        # Seat index per player; active_mask has bit i set while seat i is in the hand
+        self.player_index = {p: i for i, p in enumerate(players)}
+        self.hands: Dict[str, List[int]] = {p: [] for p in players}
         self.deck = Deck()
-        self.community: List[Card] = []
+        self.community: List[int] = []
         self.pot = 0
         self.current_bet = 0
-        self.active_players = set(players)
-        self.bets = {p: 0 for p in players}
+        self.active_mask = (1 << len(players)) - 1
+        self.bets = [0] * len(players)
+        # Bumped by snapshot() on every state change; stale writes of older states are dropped
+        self.version = 0
         self.deal()
     def deal(self):
-        for p in self.players:
-            self.hands[p] = self.deck.draw(2)
+        # One draw for every hole card, split two per seat
+        hole = self.deck.draw(2 * len(self.players))
+        for i, p in enumerate(self.players):
+            self.hands[p] = hole[2 * i:2 * i + 2]
         self.community = []
         self.pot = 0
         self.current_bet = 0
-        self.active_players = set(self.players)
-        self.bets = {p: 0 for p in self.players}
+        self.active_mask = (1 << len(self.players)) - 1
+        self.bets = [0] * len(self.players)
+        self._cache_card_strs()
+    def _cache_card_strs(self):
+        """
+        Rebuild the card string lists to_dict hands out. They are shared by
+        every snapshot until the cards change, so they are always replaced,
+        never mutated in place
+        """
+        self._hand_strs = {p: [CARD_STR[c] for c in self.hands[p]] for p in self.players}
+        self._community_strs = [CARD_STR[c] for c in self.community]
+    def _deal_board(self, n: int):
+        cards = self.deck.draw(n)
+        self.community += cards
+        self._community_strs = self._community_strs + [CARD_STR[c] for c in cards]
+    @property
+    def active_players(self) -> List[str]:
+        return [p for i, p in enumerate(self.players) if self.active_mask >> i & 1]
+    @property
+    def active_count(self) -> int:
+        return bin(self.active_mask).count('1')
+    def is_active(self, player: str) -> bool:
+        seat = self.player_index.get(player)
+        return seat is not None and bool(self.active_mask >> seat & 1)
+    def fold(self, player: str):
+        self.active_mask &= ~(1 << self.player_index[player])
+    def bet_to(self, player: str, amount: int):
+        """Bring the player's bet this round up to amount, moving the difference into the pot"""
+        seat = self.player_index[player]
+        self.pot += amount - self.bets[seat]
+        self.bets[seat] = amount
     def flop(self):
-        self.community += self.deck.draw(3)
+        self._deal_board(3)
     def turn(self):
-        self.community += self.deck.draw(1)
+        self._deal_board(1)
     def river(self):
-        self.community += self.deck.draw(1)
+        self._deal_board(1)
+    def run_out(self):
+        """Deal the rest of the board so every remaining hand can be ranked"""
+        if len(self.community) < 5:
+            self._deal_board(5 - len(self.community))
     def to_dict(self):
-        return {
-            'players': self.players,
-            'hands': {p: [str(c) for c in self.hands[p]] for p in self.players},
-            'community': [str(c) for c in self.community],
-            'pot': self.pot,
-            'current_bet': self.current_bet,
-            'active_players': list(self.active_players),
-            'bets': self.bets
-        }
-
-# --- Poker Hand Evaluator (simplified) ---
-def evaluate_hand(player_hand: List[Card], community: List[Card]) -> int:
-    # Dummy: just use the highest card (for MVP)
-    all_cards = player_hand + community
-    rank_order = {r: i for i, r in enumerate(RANKS)}
-    max_rank = max(all_cards, key=lambda c: rank_order[c.rank])
-    return rank_order[max_rank.rank]
-
-# --- Winner decision (simplified) ---
+        return _to_dict_for(len(self.players))(self)
+    def snapshot(self):
+        """to_dict for a new state: bumps the version first. Call under the game's lock"""
+        self.version += 1
+        return self.to_dict()
+
+@lru_cache(maxsize=None)
+def _to_dict_for(n_players: int):
+    """
+    Compile a to_dict specialised for n_players seats, with the per-seat
+    loops unrolled. Only seat numbers go into the generated source; player
+    names are read from the game at call time and card strings come from
+    the game's cache
+    """
+    seats = range(n_players)
+    names = ''.join(f'p{i}, ' for i in seats)
+    bets = ''.join(f'b{i}, ' for i in seats)
+    lines = [
+        'def to_dict(self):',
+        # With no seats there is nothing to unpack (and "= players = ..." would not parse)
+        f'    {names}= players = self.players' if n_players else '    players = self.players',
+        f'    {bets}= self.bets' if n_players else '',
+        '    hands = self._hand_strs',
+        '    mask = self.active_mask',
+        '    active = []',
+    ]
+    lines += [f'    if mask & {1 << i}: active.append(p{i})' for i in seats]
+    lines += [
+        '    return {',
+        "        'players': players,",
+        "        'hands': {" + ', '.join(f'p{i}: hands[p{i}]' for i in seats) + '},',
+        "        'community': self._community_strs,",
+        "        'pot': self.pot,",
+        "        'current_bet': self.current_bet,",
+        "        'active_players': active,",
+        "        'bets': {" + ', '.join(f'p{i}: b{i}' for i in seats) + '},',
+        "        'version': self.version,",
+        '    }',
+    ]
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['to_dict']
+
+# --- Player actions ---
+def _apply_fold(game: PokerGame, player: str, amount: Optional[int]):
+    game.fold(player)
+
+def _apply_call(game: PokerGame, player: str, amount: Optional[int]):
+    game.bet_to(player, game.current_bet)
+
+def _apply_raise(game: PokerGame, player: str, amount: Optional[int]):
+    if amount is None or amount <= game.current_bet:
+        raise ValueError("Invalid raise amount")
+    game.current_bet = amount
+    game.bet_to(player, amount)
+
+_APPLY = {'fold': _apply_fold, 'call': _apply_call, 'raise': _apply_raise}
+
+def apply_action(game: PokerGame, player: str, action: str, amount: Optional[int] = None):
+    """Apply a fold/call/raise for player; raises ValueError for unknown actions or bad amounts"""
+    handler = _APPLY.get(action)
+    if handler is None:
+        raise ValueError("Unknown action")
+    handler(game, player, amount)
+
+def create_poker_game_from_state(game_state: Dict[str, Any]) -> PokerGame:
+    """Create a PokerGame instance from a JSON game state"""
+    poker_game = PokerGame(game_state['players'])
+    
+    # Restore the game state
+    poker_game.hands = {p: [CARD_BY_STR[c] for c in game_state['hands'][p]] 
+                        for p in game_state['players']}
+    poker_game.community = [CARD_BY_STR[c] for c in game_state['community']]
+    poker_game.deck.discard([c for hand in poker_game.hands.values() for c in hand] + poker_game.community)
+    poker_game.pot = game_state['pot']
+    poker_game.current_bet = game_state['current_bet']
+    poker_game.active_mask = sum(1 << poker_game.player_index[p] for p in game_state['active_players'])
+    poker_game.bets = [game_state['bets'][p] for p in game_state['players']]
+    poker_game.version = game_state.get('version', 0)
+    poker_game._cache_card_strs()
+    
+    return poker_game
+
+# --- Poker Hand Evaluator (Cactus Kev) ---
+def evaluate_hand(player_hand: List[int], community: List[int]) -> int:
+    # 1 is a royal flush, 7462 the worst high card: lower is stronger
+    return int(eval_7cards(CARD_INT[player_hand + community]))
+
+# --- Winner decision ---
+def decide_winner_2p(game: PokerGame, a: str, b: str) -> Tuple[str, ...]:
+    """Heads-up showdown: two evaluations and one compare, no tie bookkeeping"""
+    score_a = evaluate_hand(game.hands[a], game.community)
+    score_b = evaluate_hand(game.hands[b], game.community)
+    if score_a < score_b:
+        return (a,)
+    if score_b < score_a:
+        return (b,)
+    return (a, b)
+
 def decide_winner(game: PokerGame) -> List[str]:
-    best_score = -1
-    winners = []
-    for p in game.active_players:
-        score = evaluate_hand(game.hands[p], game.community)
-        if score > best_score:
-            best_score = score
-            winners = [p]
-        elif score == best_score:
-            winners.append(p)
-    return winners
+    """Players holding the best hand among the active seats; empty if every seat folded"""
+    if not game.active_mask:
+        return []
+    if game.active_count == 2:
+        return list(decide_winner_2p(game, *game.active_players))
+    # Walk the set bits of the active mask, lowest seat first
+    scores = {}
+    mask = game.active_mask
+    while mask:
+        p = game.players[(mask & -mask).bit_length() - 1]
+        scores[p] = evaluate_hand(game.hands[p], game.community)
+        mask &= mask - 1
+    # Smaller Cactus Kev rank = stronger hand, so the winners hold the minimum
+    best_score = min(scores.values())
+    return [p for p, score in scores.items() if score == best_score]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Dict, Any
 
 class UserCreate(BaseModel):
     username: str
@@ -9,8 +9,7 @@ class UserOut(BaseModel):
     id: int
     username: str
     credits: float
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TableCreate(BaseModel):
     name: str
@@ -19,8 +18,7 @@ class TableOut(BaseModel):
     id: int
     name: str
     owner_id: int
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class GameCreate(BaseModel):
     table_id: int
@@ -29,6 +27,14 @@ class GameOut(BaseModel):
     id: int
     table_id: int
     owner_id: int
-    state: str
-    class Config:
-        orm_mode = True
+    state: Dict[str, Any]
+    model_config = ConfigDict(from_attributes=True)
+
+class LeaderboardEntry(BaseModel):
+    user_id: int
+    username: str
+    tournaments_played: int
+    tournaments_won: int
+    total_winnings: float
+    rank_points: int
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,97 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from backend.card_eval import CARD_INT, PRIMES, SUIT_BITS, eval_5cards, eval_7cards, mc_equity
+from backend.poker_logic import CARD_BY_STR, CARD_STR, RANKS, SUITS
+
+
+def cards(hand: str) -> np.ndarray:
+    """Cactus Kev integers for a space separated hand such as 'A♠ K♠'"""
+    return CARD_INT[[CARD_BY_STR[c] for c in hand.split()]]
+
+
+def rank5(hand: str) -> int:
+    return int(eval_5cards(*cards(hand)))
+
+
+def test_card_str_and_card_int_round_trip():
+    assert len(CARD_STR) == len(set(CARD_STR)) == 52
+    assert len(set(CARD_INT.tolist())) == 52
+    for card_id, text in enumerate(CARD_STR):
+        assert CARD_BY_STR[text] == card_id
+        rank, suit = divmod(card_id, 4)
+        assert text == RANKS[rank] + SUITS[suit]
+        code = int(CARD_INT[card_id])
+        assert code & 0xFF == PRIMES[rank]
+        assert (code >> 8) & 0xF == rank
+        assert code & 0xF000 == SUIT_BITS[suit]
+        assert code >> 16 == 1 << rank
+
+
+def test_extremes():
+    assert rank5('A♠ K♠ Q♠ J♠ 10♠') == 1
+    assert rank5('7♠ 5♥ 4♦ 3♣ 2♠') == 7462
+
+
+def test_hand_classes_in_order():
+    # Lower is stronger
+    ordered = [
+        'A♠ K♠ Q♠ J♠ 10♠',  # royal flush
+        '9♥ 8♥ 7♥ 6♥ 5♥',  # straight flush
+        '5♦ 4♦ 3♦ 2♦ A♦',  # steel wheel
+        'K♠ K♥ K♦ K♣ 2♠',  # four of a kind
+        'Q♠ Q♥ Q♦ 2♣ 2♠',  # full house
+        'A♣ J♣ 9♣ 6♣ 3♣',  # flush
+        '10♠ 9♥ 8♦ 7♣ 6♠',  # straight
+        '5♠ 4♥ 3♦ 2♣ A♠',  # wheel
+        '8♠ 8♥ 8♦ K♣ 2♠',  # three of a kind
+        'J♠ J♥ 4♦ 4♣ A♠',  # two pair
+        'A♠ A♥ K♦ 7♣ 3♠',  # one pair
+        'A♠ K♥ Q♦ J♣ 9♠',  # high card
+    ]
+    ranks = [rank5(hand) for hand in ordered]
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == len(ranks)
+
+
+def test_kickers_break_ties_within_a_class():
+    assert rank5('A♠ A♥ K♦ 7♣ 3♠') < rank5('A♦ A♣ Q♦ J♣ 10♠')
+    assert rank5('9♠ 9♥ 9♦ 4♣ 4♠') < rank5('8♠ 8♥ 8♦ A♣ A♠')
+
+
+def test_same_ranks_in_other_suits_tie():
+    assert rank5('A♠ K♥ Q♦ J♣ 9♠') == rank5('A♥ K♦ Q♣ J♠ 9♥')
+    assert rank5('7♠ 7♥ 3♦ 3♣ K♠') == rank5('7♦ 7♣ 3♠ 3♥ K♦')
+
+
+def test_seven_cards_pick_the_best_five():
+    # The hole cards don't play: the board is a straight flush
+    hand = cards('2♣ 3♦ 9♥ 8♥ 7♥ 6♥ 5♥')
+    assert eval_7cards(hand) == rank5('9♥ 8♥ 7♥ 6♥ 5♥')
+    # Two pair plus a pocket pair: the best two pair and kicker are chosen
+    hand = cards('K♠ K♥ 4♦ 4♣ 2♠ 2♥ Q♦')
+    assert eval_7cards(hand) == rank5('K♠ K♥ 4♦ 4♣ Q♦')
+
+
+def test_seven_card_rank_is_min_over_five_card_subsets():
+    rng = np.random.default_rng(0)
+    for n in (5, 6, 7):
+        for _ in range(200):
+            hand = CARD_INT[rng.choice(52, n, replace=False)]
+            best = min(eval_5cards(*combo) for combo in combinations(hand, 5))
+            assert eval_7cards(hand) == best
+
+
+def test_too_few_cards_rejected():
+    with pytest.raises(ValueError):
+        eval_7cards(cards('A♠ K♠ Q♠ J♠'))
+
+
+def test_mc_equity_is_seeded_and_sensible():
+    aces = cards('A♠ A♥')
+    board = CARD_INT[:0]
+    assert mc_equity(aces, board, 1, 2000, 7) == mc_equity(aces, board, 1, 2000, 7)
+    # Pocket aces win about 85% heads-up against a random hand
+    assert 0.8 < mc_equity(aces, board, 1, 4000, 7) < 0.9
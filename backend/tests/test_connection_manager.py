@@ -0,0 +1,109 @@
+import asyncio
+import copy
+import zlib
+
+import orjson
+
+from backend.websockets import connection_manager
+from backend.websockets.connection_manager import BATCH_WINDOW, FRAME_PLAIN, ConnectionManager, _diff
+
+STATE = {
+    "players": ["alice", "bob"],
+    "hands": {"alice": ["A♠", "K♠"], "bob": ["2♥", "7♦"]},
+    "community": [],
+    "pot": 30,
+}
+
+
+def test_view_for_reveals_only_own_cards():
+    manager = ConnectionManager()
+    assert manager.view_for(STATE, "alice")["hands"] == {"alice": ["A♠", "K♠"], "bob": ["??", "??"]}
+    assert manager.view_for(STATE, "spectator")["hands"] == {"alice": ["??", "??"], "bob": ["??", "??"]}
+    assert STATE["hands"]["bob"] == ["2♥", "7♦"]
+
+
+def test_diff_descends_into_unchanged_key_sets():
+    old = {"pot": 30, "bets": {"alice": 10, "bob": 20}, "community": []}
+    new = {"pot": 50, "bets": {"alice": 30, "bob": 20}, "community": ["A♠", "K♠", "Q♠"]}
+    assert _diff(old, new) == [
+        [["pot"], 50],
+        [["bets", "alice"], 30],
+        [["community"], ["A♠", "K♠", "Q♠"]],
+    ]
+    assert _diff(new, new) == []
+    # A changed key set replaces the whole dict
+    assert _diff(old, {**old, "bets": {"alice": 10}}) == [[["bets"], {"alice": 10}]]
+
+
+def apply_patch(state: dict, patch: list) -> dict:
+    """What a client does with a game_delta"""
+    state = copy.deepcopy(state)
+    for path, value in patch:
+        target = state
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+    return state
+
+
+class FakeSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, payload):
+        self.frames.append(payload)
+
+    def messages(self):
+        out = []
+        for frame in self.frames:
+            body = frame[1:] if frame[:1] == FRAME_PLAIN else zlib.decompress(frame[1:])
+            out.extend(orjson.loads(body))
+        return out
+
+
+def replay(messages):
+    """The game state a client ends up with after these messages"""
+    state = None
+    for message in messages:
+        if message["type"] == "game_update":
+            state = message["state"]
+        elif message["type"] == "game_delta":
+            state = apply_patch(state, message["patch"])
+    return state
+
+
+def test_deltas_rebuild_the_player_view():
+    async def run():
+        manager = ConnectionManager()
+        socket = FakeSocket()
+        await manager.connect(socket, "t", "alice")
+        for pot in range(5):
+            await manager.update_game_state("t", {**STATE, "pot": pot})
+            await asyncio.sleep(0)
+        await asyncio.sleep(BATCH_WINDOW * 3)
+        return socket.messages()
+
+    messages = asyncio.run(run())
+    assert [m["type"] for m in messages if m["type"].startswith("game_")] == ["game_update"] + ["game_delta"] * 4
+    assert replay(messages) == {**STATE, "pot": 4, "hands": {"alice": ["A♠", "K♠"], "bob": ["??", "??"]}}
+
+
+def test_overflow_resends_full_state(monkeypatch):
+    monkeypatch.setattr(connection_manager, "MAX_QUEUE_SIZE", 3)
+
+    async def run():
+        manager = ConnectionManager()
+        socket = FakeSocket()
+        await manager.connect(socket, "t", "alice")
+        # No awaits in between: the relay can't drain, so the queue overflows
+        for pot in range(10):
+            await manager.update_game_state("t", {**STATE, "pot": pot})
+        await asyncio.sleep(BATCH_WINDOW * 3)
+        return socket.messages()
+
+    messages = asyncio.run(run())
+    assert messages[0]["type"] == "game_update"
+    assert replay(messages)["pot"] == 9
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.database import Base
+from backend.game_store import active_games, evict_game, game_lock, older_state, previous_state
+from backend.poker_logic import PokerGame
+from backend.websockets.handlers import commit_game
+
+
+def test_evicted_game_keeps_its_lock():
+    lock = game_lock(-1)
+    active_games[-1] = PokerGame(["alice", "bob"])
+    evict_game(-1)
+    assert -1 not in active_games
+    assert not lock.locked()
+    # A reloaded game is serialized against threads still holding the old reference
+    assert game_lock(-1) is lock
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    # Only games: its FKs aren't enforced by SQLite and the rest isn't needed
+    Base.metadata.create_all(engine, tables=[models.Game.__table__])
+    with sessionmaker(bind=engine)() as session:
+        session.add(models.Game(id=1, state={"pot": 10, "community": ["A♠"], "version": 3}))
+        session.commit()
+        yield session
+
+
+def stored(db):
+    db.expire_all()
+    return db.get(models.Game, 1).state
+
+
+def write(db, state):
+    """persist_game's guarded UPDATE"""
+    db.query(models.Game).filter(models.Game.id == 1, older_state(state["version"])).update(
+        {models.Game.state: state}, synchronize_session=False
+    )
+    db.commit()
+
+
+def test_older_state_never_rolls_back(db):
+    write(db, {"pot": 5, "community": [], "version": 2})
+    write(db, {"pot": 10, "community": ["A♠"], "version": 3})
+    assert stored(db)["pot"] == 10
+    write(db, {"pot": 40, "community": ["A♠"], "version": 4})
+    assert stored(db) == {"pot": 40, "community": ["A♠"], "version": 4}
+
+
+def test_older_state_accepts_unversioned_rows(db):
+    db.query(models.Game).update({models.Game.state: {"pot": 0}}, synchronize_session=False)
+    write(db, {"pot": 1, "version": 0})
+    assert stored(db) == {"pot": 1, "version": 0}
+
+
+def test_patch_needs_the_direct_predecessor(db):
+    # The stored row is at 3, so a betting patch for 5 would skip version 4's cards:
+    # commit_game has to fall back to writing the whole state
+    state = {"pot": 90, "community": ["A♠", "K♠", "Q♠"], "version": 5}
+    assert db.query(models.Game).filter(previous_state(5)).count() == 0
+    assert db.query(models.Game).filter(previous_state(4)).count() == 1
+    commit_game(db, "1", state, [], 0.0, changed=("pot", "version"))
+    assert stored(db) == state
@@ -0,0 +1,88 @@
+import pytest
+
+from backend.poker_logic import CARD_STR, PokerGame, create_poker_game_from_state, decide_winner
+from backend.websockets.handlers import settle_game
+
+
+def test_no_winner_when_every_seat_folded():
+    game = PokerGame(["alice", "ai_1", "ai_2"])
+    game.bet_to("alice", 30)
+    for player in game.players:
+        game.fold(player)
+    assert decide_winner(game) == []
+    assert settle_game(game) == ([], 0.0)
+
+
+def test_to_dict_without_players():
+    state = PokerGame([]).to_dict()
+    assert state["players"] == [] and state["hands"] == {} and state["bets"] == {}
+    assert state["active_players"] == []
+
+
+def reference_to_dict(game: PokerGame) -> dict:
+    """The plain loop version of to_dict that the generated code must match"""
+    return {
+        'players': game.players,
+        'hands': {p: [CARD_STR[c] for c in game.hands[p]] for p in game.players},
+        'community': [CARD_STR[c] for c in game.community],
+        'pot': game.pot,
+        'current_bet': game.current_bet,
+        'active_players': game.active_players,
+        'bets': dict(zip(game.players, game.bets)),
+        'version': game.version,
+    }
+
+
+@pytest.mark.parametrize("n_players", range(1, 7))
+def test_generated_to_dict_matches_reference(n_players):
+    game = PokerGame([f"p{i}" for i in range(n_players)])
+    assert game.to_dict() == reference_to_dict(game)
+    game.bet_to("p0", 20)
+    game.fold(game.players[-1])
+    for street in (game.flop, game.turn, game.river):
+        street()
+        assert game.snapshot() == reference_to_dict(game)
+
+
+def test_player_names_are_data_not_code():
+    names = ["x'}); import os #", "{p0}", "b"]
+    game = PokerGame(names)
+    assert game.to_dict()["players"] == names
+    assert set(game.to_dict()["hands"]) == set(names)
+
+
+def test_snapshot_bumps_version():
+    game = PokerGame(["alice", "bob"])
+    assert game.to_dict()["version"] == 0
+    assert game.snapshot()["version"] == 1
+    assert game.to_dict()["version"] == 1
+
+
+def test_serialized_lists_are_never_mutated():
+    game = PokerGame(["alice", "bob"])
+    before = game.to_dict()
+    game.flop()
+    game.turn()
+    assert before["community"] == []
+    assert len(game.to_dict()["community"]) == 4
+
+
+def test_state_round_trip():
+    game = PokerGame(["alice", "ai_1", "ai_2"])
+    game.current_bet = 40
+    game.bet_to("alice", 40)
+    game.fold("ai_1")
+    game.flop()
+    game.snapshot()
+    state = game.to_dict()
+
+    restored = create_poker_game_from_state(state)
+    assert restored.to_dict() == state
+    assert restored.version == game.version
+    assert restored.is_active("alice") and not restored.is_active("ai_1")
+
+    # Cards in play are out of the restored deck, so the board can't repeat one
+    in_play = {c for hand in restored.hands.values() for c in hand} | set(restored.community)
+    restored.run_out()
+    dealt = restored.community[3:]
+    assert len(dealt) == 2 and not in_play & set(dealt)
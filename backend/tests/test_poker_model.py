@@ -0,0 +1,61 @@
+import asyncio
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from backend.ml_models.poker_model import BatchPredictor, CompiledForest
+
+
+def test_compiled_forest_matches_sklearn():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 1000, size=(2000, 6)).astype(np.float32)
+    y = (X[:, 3] > 500).astype(np.int64) + (X[:, 0] > X[:, 1]).astype(np.int64)
+    forest = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+    X_test = rng.uniform(0, 1000, size=(20000, 6)).astype(np.float32)
+    np.testing.assert_array_equal(CompiledForest(forest).predict(X_test), forest.predict(X_test))
+
+
+class StubModel:
+    """Just the two calls BatchPredictor makes"""
+    def _extract_features(self, game_state, player_name):
+        return [game_state["hands"][player_name]]
+
+    def predict_rows(self, rows):
+        return [{"action": "call", "amount": row[0]} for row in rows]
+
+
+def test_batch_failure_is_limited_to_the_bad_request():
+    predictor = BatchPredictor(StubModel())
+    state = {"hands": {"ai_1": 1, "ai_2": 2}}
+
+    async def run():
+        return await asyncio.gather(
+            predictor.predict(state, "ai_1"),
+            predictor.predict(state, "nobody"),
+            predictor.predict(state, "ai_2"),
+            return_exceptions=True,
+        )
+
+    first, bad, last = asyncio.run(run())
+    assert first == {"action": "call", "amount": 1}
+    assert isinstance(bad, KeyError)
+    assert last == {"action": "call", "amount": 2}
+
+
+def test_model_failure_reaches_every_request():
+    class Broken(StubModel):
+        def predict_rows(self, rows):
+            raise RuntimeError("model down")
+
+    predictor = BatchPredictor(Broken())
+    state = {"hands": {"ai_1": 1, "ai_2": 2}}
+
+    async def run():
+        return await asyncio.gather(
+            predictor.predict(state, "ai_1"),
+            predictor.predict(state, "ai_2"),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
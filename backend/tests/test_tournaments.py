@@ -0,0 +1,102 @@
+import orjson
+import pytest
+import redis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models
+from backend.cache import get_redis
+from backend.database import Base, get_db
+from backend.tournaments import tournament_router
+from backend.tournaments.models import Tournament, TournamentParticipant
+
+
+class FakeRedis:
+    def __init__(self, fail: bool = False):
+        self.data = {}
+        self.fail = fail
+
+    def get(self, key):
+        if self.fail:
+            raise redis.ConnectionError("down")
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        if self.fail:
+            raise redis.ConnectionError("down")
+        self.data[key] = value
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    # Only the tables the leaderboard reads; the rest of the schema is Postgres-only (JSONB)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__, Tournament.__table__, TournamentParticipant.__table__,
+    ])
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        alice = models.User(username="alice", hashed_password="x")
+        bob = models.User(username="bob", hashed_password="x")
+        first = Tournament(name="first", prize_pool=500.0)
+        second = Tournament(name="second", prize_pool=300.0)
+        db.add_all([alice, bob, first, second])
+        db.flush()
+        db.add_all([
+            TournamentParticipant(tournament_id=first.id, user_id=alice.id, final_position=1, points_earned=100),
+            TournamentParticipant(tournament_id=second.id, user_id=alice.id, final_position=2, points_earned=50),
+            TournamentParticipant(tournament_id=first.id, user_id=bob.id, final_position=2, points_earned=60),
+            TournamentParticipant(tournament_id=second.id, user_id=bob.id, points_earned=0),
+        ])
+        db.commit()
+    return factory
+
+
+def make_client(session_factory, cache) -> TestClient:
+    app = FastAPI()
+    app.include_router(tournament_router)
+
+    def db_override():
+        with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = db_override
+    app.dependency_overrides[get_redis] = lambda: cache
+    return TestClient(app)
+
+
+def test_leaderboard_is_routed_and_aggregated(session_factory):
+    cache = FakeRedis()
+    response = make_client(session_factory, cache).get("/tournaments/leaderboard")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_players"] == 2
+    alice, bob = body["leaderboard"]
+    assert alice == {
+        "user_id": alice["user_id"], "username": "alice", "tournaments_played": 2, "tournaments_won": 1,
+        "total_winnings": 500.0, "rank_points": 150, "highest_position": 1,
+    }
+    assert (bob["username"], bob["tournaments_won"], bob["total_winnings"], bob["highest_position"]) == ("bob", 0, 0.0, 2)
+    assert orjson.loads(cache.data["lb:all"]) == body
+
+
+def test_leaderboard_served_from_cache(session_factory):
+    cache = FakeRedis()
+    cache.data["lb:week"] = orjson.dumps({"leaderboard": [], "total_players": 0})
+    response = make_client(session_factory, cache).get("/tournaments/leaderboard", params={"timeframe": "week"})
+    assert response.status_code == 200
+    assert response.json() == {"leaderboard": [], "total_players": 0}
+
+
+def test_leaderboard_works_without_redis(session_factory):
+    response = make_client(session_factory, FakeRedis(fail=True)).get("/tournaments/leaderboard")
+    assert response.status_code == 200
+    assert response.json()["total_players"] == 2
+
+
+def test_tournament_ids_still_routed(session_factory):
+    response = make_client(session_factory, FakeRedis()).get("/tournaments/999")
+    assert response.status_code == 404
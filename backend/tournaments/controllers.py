@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, desc, exists, case
 from typing import List, Optional
 from datetime import datetime, timedelta
+import orjson
+import redis
 
 from ..database import get_db
+from ..cache import get_redis
 from .. import models
 from ..auth import get_current_user
 from . import schemas
@@ -15,6 +18,33 @@ router = APIRouter(
     tags=["tournaments"],
 )
 
+LEADERBOARD_TTL = 60  # seconds
+
+def _debit_buy_in(db: Session, user: models.User, buy_in: float):
+    """Take the buy-in from the user's credits in one conditional UPDATE, so concurrent requests can't overdraw"""
+    debited = db.query(models.User).filter(
+        models.User.id == user.id,
+        models.User.credits >= buy_in
+    ).update({models.User.credits: models.User.credits - buy_in}, synchronize_session=False)
+    
+    if not debited:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Not enough credits. Buy-in is {buy_in}"
+        )
+
+def _with_participants_count(db: Session):
+    """Query (Tournament, participants_count) pairs in one round-trip"""
+    count_sq = db.query(
+        TournamentParticipant.tournament_id,
+        func.count().label("cnt")
+    ).group_by(TournamentParticipant.tournament_id).subquery()
+    
+    return db.query(Tournament, func.coalesce(count_sq.c.cnt, 0)).outerjoin(
+        count_sq,
+        Tournament.id == count_sq.c.tournament_id
+    )
+
 @router.post("/", response_model=schemas.TournamentOut)
 def create_tournament(
     tournament: schemas.TournamentCreate,
@@ -28,10 +58,14 @@ def create_tournament(
             detail="Tournament start time must be in the future"
         )
     
+    # Deduct buy-in from user's credits
+    _debit_buy_in(db, current_user, tournament.buy_in)
+    
     new_tournament = Tournament(
         name=tournament.name,
         description=tournament.description,
         buy_in=tournament.buy_in,
+        prize_pool=tournament.buy_in,
         max_players=tournament.max_players,
         blind_increase_minutes=tournament.blind_increase_minutes,
         initial_stack=tournament.initial_stack,
@@ -41,8 +75,7 @@ def create_tournament(
     )
     
     db.add(new_tournament)
-    db.commit()
-    db.refresh(new_tournament)
+    db.flush()
     
     # Add creator as first participant
     participant = TournamentParticipant(
@@ -52,12 +85,6 @@ def create_tournament(
         chips=new_tournament.initial_stack
     )
     
-    # Deduct buy-in from user's credits
-    current_user.credits -= tournament.buy_in
-    
-    # Add to prize pool
-    new_tournament.prize_pool += tournament.buy_in
-    
     db.add(participant)
     db.commit()
     db.refresh(new_tournament)
@@ -72,38 +99,111 @@ def get_tournaments(
     db: Session = Depends(get_db)
 ):
     """Get a list of tournaments with filtering options"""
-    query = db.query(Tournament)
+    query = _with_participants_count(db)
     
     if status:
         query = query.filter(Tournament.status == status)
     
-    tournaments = query.order_by(desc(Tournament.created_at)).offset(skip).limit(limit).all()
+    rows = query.order_by(desc(Tournament.created_at)).offset(skip).limit(limit).all()
     
-    # Add participants count to each tournament
-    for tournament in tournaments:
-        tournament.participants_count = db.query(TournamentParticipant).filter(
-            TournamentParticipant.tournament_id == tournament.id
-        ).count()
+    # Attach participants count to each tournament
+    tournaments = []
+    for tournament, count in rows:
+        tournament.participants_count = count
+        tournaments.append(tournament)
     
     return tournaments
 
+# Declared before /{tournament_id} so "leaderboard" is not parsed as an id
+@router.get("/leaderboard", response_model=schemas.LeaderboardResponse)
+def get_leaderboard(
+    timeframe: str = "all",  # all, month, week
+    db: Session = Depends(get_db),
+    cache: redis.Redis = Depends(get_redis)
+):
+    """Get poker leaderboard based on tournament performance"""
+    # The leaderboard is the same for every caller, so serve it from Redis when possible
+    key = f"lb:{timeframe}"
+    try:
+        cached = cache.get(key)
+    except redis.RedisError:
+        cached = None
+    if cached:
+        return orjson.loads(cached)
+    
+    # Build query with filters based on timeframe
+    base_query = db.query(
+        models.User.id.label("user_id"),
+        models.User.username,
+        func.count(TournamentParticipant.id).label("tournaments_played"),
+        func.sum(
+            case((TournamentParticipant.final_position == 1, 1), else_=0)
+        ).label("tournaments_won"),
+        func.coalesce(func.sum(
+            case((TournamentParticipant.final_position == 1, Tournament.prize_pool), else_=0.0)
+        ), 0.0).label("total_winnings"),
+        func.coalesce(func.sum(TournamentParticipant.points_earned), 0).label("rank_points"),
+        # NULL (no finishing position yet) is skipped by MIN and comes back as None
+        func.min(
+            case((TournamentParticipant.final_position > 0, TournamentParticipant.final_position))
+        ).label("highest_position"),
+    ).join(
+        TournamentParticipant,
+        models.User.id == TournamentParticipant.user_id
+    ).join(
+        Tournament,
+        Tournament.id == TournamentParticipant.tournament_id
+    ).group_by(
+        models.User.id,
+        models.User.username
+    )
+    
+    # Apply time filters
+    if timeframe == "month":
+        month_ago = datetime.now() - timedelta(days=30)
+        base_query = base_query.filter(TournamentParticipant.created_at >= month_ago)
+    elif timeframe == "week":
+        week_ago = datetime.now() - timedelta(days=7)
+        base_query = base_query.filter(TournamentParticipant.created_at >= week_ago)
+    
+    # Get results ordered by rank points
+    leaderboard_entries = base_query.order_by(desc("rank_points")).all()
+    
+    # Every column is already in response shape, so rows map straight to entries
+    result = [entry._asdict() for entry in leaderboard_entries]
+    
+    # Calculate total players
+    total_players = len(result)
+    
+    response = {
+        "leaderboard": result,
+        "total_players": total_players
+    }
+    
+    try:
+        cache.setex(key, LEADERBOARD_TTL, orjson.dumps(response))
+    except redis.RedisError:
+        pass
+    
+    return response
+
 @router.get("/{tournament_id}", response_model=schemas.TournamentDetailOut)
 def get_tournament(
     tournament_id: int,
     db: Session = Depends(get_db)
 ):
     """Get details of a specific tournament including participants"""
-    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+    # Load participants and their users up front: 3 queries however many players
+    tournament = db.query(Tournament).options(
+        selectinload(Tournament.participants).selectinload(TournamentParticipant.user)
+    ).filter(Tournament.id == tournament_id).first()
     if not tournament:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tournament not found"
         )
     
-    # Count participants
-    tournament.participants_count = db.query(TournamentParticipant).filter(
-        TournamentParticipant.tournament_id == tournament.id
-    ).count()
+    tournament.participants_count = len(tournament.participants)
     
     return tournament
 
@@ -128,11 +228,19 @@ def register_for_tournament(
             detail=f"Tournament is not open for registration (status: {tournament.status})"
         )
     
-    # Check if tournament is full
-    participants_count = db.query(TournamentParticipant).filter(
+    # Count participants and check for an existing registration in one round-trip
+    already_registered = exists().where(
+        TournamentParticipant.tournament_id == tournament.id,
+        TournamentParticipant.user_id == current_user.id
+    )
+    participants_count, existing = db.query(
+        func.count(TournamentParticipant.id),
+        already_registered
+    ).filter(
         TournamentParticipant.tournament_id == tournament.id
-    ).count()
+    ).one()
     
+    # Check if tournament is full
     if participants_count >= tournament.max_players:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -140,23 +248,14 @@ def register_for_tournament(
         )
     
     # Check if user is already registered
-    existing = db.query(TournamentParticipant).filter(
-        TournamentParticipant.tournament_id == tournament.id,
-        TournamentParticipant.user_id == current_user.id
-    ).first()
-    
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You are already registered for this tournament"
         )
     
-    # Check if user has enough credits
-    if current_user.credits < tournament.buy_in:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Not enough credits. Buy-in is {tournament.buy_in} but you have {current_user.credits}"
-        )
+    # Check and deduct the buy-in in one step
+    _debit_buy_in(db, current_user, tournament.buy_in)
     
     # Register the user
     participant = TournamentParticipant(
@@ -166,11 +265,11 @@ def register_for_tournament(
         chips=tournament.initial_stack
     )
     
-    # Deduct buy-in from user credits
-    current_user.credits -= tournament.buy_in
-    
-    # Add to prize pool
-    tournament.prize_pool += tournament.buy_in
+    # Add to prize pool in SQL so concurrent registrations don't overwrite each other
+    db.query(Tournament).filter(Tournament.id == tournament.id).update(
+        {Tournament.prize_pool: Tournament.prize_pool + tournament.buy_in},
+        synchronize_session=False
+    )
     
     db.add(participant)
     db.commit()
@@ -244,76 +343,3 @@ def start_tournament(
     tournament.participants_count = participants_count
     
     return tournament
-
-@router.get("/leaderboard", response_model=schemas.LeaderboardResponse)
-def get_leaderboard(
-    timeframe: str = "all",  # all, month, week
-    db: Session = Depends(get_db)
-):
-    """Get poker leaderboard based on tournament performance"""
-    # Build query with filters based on timeframe
-    base_query = db.query(
-        models.User.id,
-        models.User.username,
-        func.count(TournamentParticipant.id).label("tournaments_played"),
-        func.sum(
-            func.case(
-                [(TournamentParticipant.final_position == 1, 1)],
-                else_=0
-            )
-        ).label("tournaments_won"),
-        func.sum(TournamentParticipant.points_earned).label("rank_points"),
-        func.min(
-            func.case(
-                [(TournamentParticipant.final_position > 0, TournamentParticipant.final_position)],
-                else_=999
-            )
-        ).label("highest_position"),
-    ).join(
-        TournamentParticipant,
-        models.User.id == TournamentParticipant.user_id
-    ).group_by(
-        models.User.id,
-        models.User.username
-    )
-    
-    # Apply time filters
-    if timeframe == "month":
-        month_ago = datetime.now() - timedelta(days=30)
-        base_query = base_query.filter(TournamentParticipant.created_at >= month_ago)
-    elif timeframe == "week":
-        week_ago = datetime.now() - timedelta(days=7)
-        base_query = base_query.filter(TournamentParticipant.created_at >= week_ago)
-    
-    # Get results ordered by rank points
-    leaderboard_entries = base_query.order_by(desc("rank_points")).all()
-    
-    # Convert to response format with total_winnings calculation
-    result = []
-    for entry in leaderboard_entries:
-        # Get sum of winnings from tournaments
-        winnings = db.query(func.sum(Tournament.prize_pool)).join(
-            TournamentParticipant,
-            Tournament.id == TournamentParticipant.tournament_id
-        ).filter(
-            TournamentParticipant.user_id == entry.id,
-            TournamentParticipant.final_position == 1
-        ).scalar() or 0.0
-        
-        result.append({
-            "user_id": entry.id,
-            "username": entry.username,
-            "tournaments_played": entry.tournaments_played,
-            "tournaments_won": entry.tournaments_won,
-            "total_winnings": float(winnings),
-            "rank_points": entry.rank_points or 0,
-            "highest_position": entry.highest_position if entry.highest_position != 999 else None
-        })
-    
-    # Calculate total players
-    total_players = len(result)
-    
-    return {
-        "leaderboard": result,
-        "total_players": total_players
-    }
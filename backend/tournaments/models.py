@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -56,6 +56,12 @@ class TournamentParticipant(Base):
     # Relationships
     tournament = relationship("Tournament", back_populates="participants")
     user = relationship("User")
+    
+    __table_args__ = (
+        Index('ix_tournament_participants_user_final', user_id, final_position),
+        Index('ix_tournament_participants_tournament_status', tournament_id, status),
+        Index('ix_tournament_participants_tournament_user', tournament_id, user_id),
+    )
 
 class TournamentRound(Base):
     """Model for tournament rounds/stages"""
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -40,8 +40,7 @@ class TournamentParticipantOut(TournamentParticipantBase):
     points_earned: int
     created_at: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserBasicInfo(BaseModel):
     id: int
@@ -50,8 +49,7 @@ class UserBasicInfo(BaseModel):
 class TournamentParticipantWithUser(TournamentParticipantOut):
     user: UserBasicInfo
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TournamentOut(TournamentBase):
     id: int
@@ -62,14 +60,12 @@ class TournamentOut(TournamentBase):
     created_by_id: int
     participants_count: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TournamentDetailOut(TournamentOut):
     participants: List[TournamentParticipantWithUser]
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Leaderboard Schemas
 class LeaderboardEntry(BaseModel):
@@ -79,7 +75,7 @@ class LeaderboardEntry(BaseModel):
     tournaments_won: int
     total_winnings: float
     rank_points: int
-    highest_position: int
+    highest_position: Optional[int] = None
 
 class LeaderboardResponse(BaseModel):
     leaderboard: List[LeaderboardEntry]
@@ -1,36 +1,103 @@
 from fastapi import WebSocket
-from typing import Dict, List, Set, Any
-import json
+from typing import Dict, List, Set, Any, Tuple
+from functools import lru_cache
+import orjson
 import asyncio
 import logging
+import zlib
 
 logger = logging.getLogger(__name__)
 
+# Messages queued for a connection within this window go out as one frame
+BATCH_WINDOW = 0.02
+# Most messages sent in a single frame
+MAX_BATCH_SIZE = 128
+# Outbound messages buffered per connection; beyond this the backlog is dropped
+# and the connection's game state resent in full
+MAX_QUEUE_SIZE = 256
+# A send that takes longer than this marks the connection as dead
+SEND_TIMEOUT = 5.0
+# Frames at least this large are zlib-compressed before sending
+COMPRESS_THRESHOLD = 256
+# First byte of every frame: how the JSON array after it is encoded
+FRAME_PLAIN = b"\x00"
+FRAME_ZLIB = b"\x01"
+
+@lru_cache(maxsize=256)
+def _encode_frame(batch: Tuple[bytes, ...]) -> bytes:
+    """
+    Build the frame for a batch of serialized messages. Connections at a
+    table usually drain the same broadcast batch, so the cache means it is
+    compressed once rather than once per client
+    """
+    body = b"[" + b",".join(batch) + b"]"
+    if len(body) < COMPRESS_THRESHOLD:
+        return FRAME_PLAIN + body
+    return FRAME_ZLIB + zlib.compress(body, 1)
+
+def _diff(old: Dict[str, Any], new: Dict[str, Any]) -> List[list]:
+    """
+    [path, value] pairs that turn old into new. Dicts with unchanged keys
+    (bets, hands) are diffed one level down so a single bet is one entry
+    """
+    patch = []
+    for key, value in new.items():
+        before = old.get(key)
+        if before == value:
+            continue
+        if isinstance(value, dict) and isinstance(before, dict) and before.keys() == value.keys():
+            patch.extend([[key, sub], v] for sub, v in value.items() if before[sub] != v)
+        else:
+            patch.append([[key], value])
+    return patch
+
 class ConnectionManager:
     """
     WebSocket connection manager for real-time multiplayer poker
     Manages connections, rooms, and message broadcasting
+
+    Every connection has its own outbound queue drained by a relay task, so
+    broadcasting never waits on a socket. The relay coalesces whatever is
+    queued within a batch window and sends it as a JSON array of packets in
+    one binary frame. A one byte header says whether the array is plain
+    (0x00) or zlib-compressed (0x01); compression is done here, once per
+    frame, instead of by per-message-deflate for every socket.
+
+    Game state goes out in full ("game_update") the first time a connection
+    sees it and as a "game_delta" patch against the last view it was sent
+    after that.
     """
     def __init__(self):
-        # Table/Game ID -> List of WebSocket connections
-        self.table_connections: Dict[str, List[WebSocket]] = {}
+        # Table/Game ID -> WebSocket connections; replaced rather than mutated,
+        # so a broadcast can iterate it without taking a copy
+        self.table_connections: Dict[str, Tuple[WebSocket, ...]] = {}
         # Username -> WebSocket connection
         self.user_connections: Dict[str, WebSocket] = {}
         # Username -> Table/Game ID
         self.user_tables: Dict[str, str] = {}
+        # Table/Game ID -> usernames connected to it (reverse of user_tables)
+        self.table_users: Dict[str, Set[str]] = {}
+        # WebSocket -> serialized messages waiting to be sent
+        self.queues: Dict[WebSocket, asyncio.Queue] = {}
+        # WebSocket -> task draining its queue
+        self.relays: Dict[WebSocket, asyncio.Task] = {}
+        # WebSocket -> last game state view it was sent, the base for the next delta
+        self.last_state: Dict[WebSocket, Dict[str, Any]] = {}
         
     async def connect(self, websocket: WebSocket, table_id: str, username: str):
         """Connect a new WebSocket client to a specific table"""
         await websocket.accept()
-        logger.info(f"User {username} connected to table {table_id}")
+        logger.info("User %s connected to table %s", username, table_id)
         
         # Register the connection
-        if table_id not in self.table_connections:
-            self.table_connections[table_id] = []
-        
-        self.table_connections[table_id].append(websocket)
+        self.table_connections[table_id] = self.table_connections.get(table_id, ()) + (websocket,)
         self.user_connections[username] = websocket
+        
+        queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+        self.queues[websocket] = queue
+        self.relays[websocket] = asyncio.create_task(self._relay(websocket, queue))
         self.user_tables[username] = table_id
+        self.table_users.setdefault(table_id, set()).add(username)
         
         # Notify everyone in the table about the new player
         await self.broadcast_to_table(
@@ -41,94 +108,177 @@ class ConnectionManager:
             }
         )
     
-    def disconnect(self, websocket: WebSocket, username: str):
+    async def disconnect(self, websocket: WebSocket, username: str):
         """Disconnect a client and clean up"""
-        logger.info(f"Disconnecting user {username}")
+        logger.info("Disconnecting user %s", username)
         
         # Remove from user connections
         if username in self.user_connections:
             del self.user_connections[username]
         
+        # Stop relaying and drop anything still queued for this connection
+        self.queues.pop(websocket, None)
+        self.last_state.pop(websocket, None)
+        relay = self.relays.pop(websocket, None)
+        if relay:
+            relay.cancel()
+        
         # Get the table ID and remove from table connections
         table_id = self.user_tables.get(username)
         if table_id and table_id in self.table_connections:
-            if websocket in self.table_connections[table_id]:
-                self.table_connections[table_id].remove(websocket)
+            self._remove_connection(table_id, websocket)
             
             # Notify others about the disconnect
-            asyncio.create_task(self.broadcast_to_table(
+            await self.broadcast_to_table(
                 table_id,
                 {
                     "type": "player_left",
                     "username": username
                 }
-            ))
+            )
         
         # Remove from user tables
         if username in self.user_tables:
             del self.user_tables[username]
+        
+        users = self.table_users.get(table_id)
+        if users is not None:
+            users.discard(username)
+            if not users:
+                del self.table_users[table_id]
     
     async def broadcast_to_table(self, table_id: str, message: Dict[str, Any]):
         """Broadcast a message to all connections in a table"""
         if table_id not in self.table_connections:
             return
         
-        # Convert dict to JSON string
-        message_json = json.dumps(message)
-        
-        # Send to all connections in the table
-        for connection in self.table_connections[table_id]:
-            try:
-                await connection.send_text(message_json)
-            except Exception as e:
-                logger.error(f"Error sending message to connection: {e}")
+        # Serialize once for the whole table
+        self._broadcast(table_id, orjson.dumps(message))
     
     async def send_personal_message(self, username: str, message: Dict[str, Any]):
         """Send a message to a specific user"""
         if username not in self.user_connections:
             return
         
-        message_json = json.dumps(message)
+        self._enqueue(self.user_connections[username], orjson.dumps(message))
+    
+    def _broadcast(self, table_id: str, message_json: bytes):
+        """Queue a serialized message for every connection in a table"""
+        for connection in self.table_connections.get(table_id, ()):
+            self._enqueue(connection, message_json)
+    
+    def _enqueue(self, websocket: WebSocket, message_json: bytes):
+        """Queue a serialized message for a connection without waiting on it"""
+        queue = self.queues.get(websocket)
+        if queue is None:
+            return
         
         try:
-            await self.user_connections[username].send_text(message_json)
+            queue.put_nowait(message_json)
+        except asyncio.QueueFull:
+            # A client this far behind only needs to catch up. The backlog may
+            # hold deltas, so drop all of it and resend the last state view it
+            # was given in full: every later delta (patches assign absolute
+            # values) then applies to the base it was computed against
+            while not queue.empty():
+                queue.get_nowait()
+            view = self.last_state.get(websocket)
+            if view is not None:
+                queue.put_nowait(orjson.dumps({"type": "game_update", "state": view}))
+            queue.put_nowait(message_json)
+    
+    async def _relay(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Send a connection's queued messages, one JSON array frame per batch window"""
+        while True:
+            batch = [await queue.get()]
+            
+            # Give the rest of a burst a moment to join this frame
+            await asyncio.sleep(BATCH_WINDOW)
+            while len(batch) < MAX_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            if not await self._safe_send(websocket, _encode_frame(tuple(batch))):
+                self._prune(websocket)
+                return
+    
+    async def _safe_send(self, websocket: WebSocket, payload: bytes) -> bool:
+        """Send a frame, giving up after SEND_TIMEOUT so a stuck socket is detected"""
+        try:
+            await asyncio.wait_for(websocket.send_bytes(payload), timeout=SEND_TIMEOUT)
+            return True
         except Exception as e:
-            logger.error(f"Error sending personal message to {username}: {e}")
+            logger.error("Error sending message batch to connection: %r", e)
+            return False
+    
+    def _prune(self, websocket: WebSocket):
+        """Stop broadcasting to a connection whose send failed"""
+        self.queues.pop(websocket, None)
+        self.relays.pop(websocket, None)
+        self.last_state.pop(websocket, None)
+        for table_id, connections in list(self.table_connections.items()):
+            if websocket in connections:
+                self._remove_connection(table_id, websocket)
+    
+    def _remove_connection(self, table_id: str, websocket: WebSocket):
+        self.table_connections[table_id] = tuple(c for c in self.table_connections[table_id] if c is not websocket)
     
     async def update_game_state(self, table_id: str, game_state: Dict[str, Any]):
         """Update game state for all users in a table, with hidden opponent cards"""
         if table_id not in self.table_connections:
             return
             
-        # For each user in the table, send them their own view of the game state
-        for username in [user for user, tid in self.user_tables.items() if tid == table_id]:
-            # Create a player-specific view (hide opponent cards)
-            player_view = self._create_player_view(game_state, username)
+        hands = game_state.get('hands', {})
+        # Every hand hidden: what spectators see, and the base of each player's view
+        public_view = self._create_public_view(game_state)
+        # (view, previous view) -> payload, so viewers in the same position share one encoding;
+        # the previous view is kept alongside so its id can't be reused mid-loop
+        payloads: Dict[tuple, tuple] = {}
+        
+        # For each user in the table, queue their own view of the game state
+        for username in self.table_users.get(table_id, ()):
+            websocket = self.user_connections.get(username)
+            if websocket is None:
+                continue
             
-            await self.send_personal_message(
-                username,
-                {
-                    "type": "game_update",
-                    "state": player_view
-                }
-            )
+            if username in hands:
+                # Create a player-specific view (hide opponent cards)
+                view = self._create_player_view(public_view, hands, username)
+            else:
+                view = public_view
+            
+            last = self.last_state.get(websocket)
+            key = (id(view), id(last))
+            if key not in payloads:
+                if last is None:
+                    message = {"type": "game_update", "state": view}
+                else:
+                    patch = _diff(last, view)
+                    message = {"type": "game_delta", "patch": patch} if patch else None
+                payloads[key] = (message and orjson.dumps(message), last)
+            
+            self.last_state[websocket] = view
+            payload = payloads[key][0]
+            if payload:
+                self._enqueue(websocket, payload)
     
-    def _create_player_view(self, game_state: Dict[str, Any], username: str) -> Dict[str, Any]:
-        """Create a player-specific view of the game state (hide opponent cards)"""
-        # Make a copy of the game state
-        player_view = game_state.copy()
-        
-        # Create a new "hands" dictionary with only the player's own cards
-        hands = game_state.get('hands', {}).copy()
-        for player, cards in hands.items():
-            if player != username:
-                # Replace opponent cards with hidden values
-                hands[player] = ["??" for _ in cards]
-        
-        # Update the player view with modified hands
-        player_view['hands'] = hands
-        
-        return player_view
+    def view_for(self, game_state: Dict[str, Any], username: str) -> Dict[str, Any]:
+        """What one user may see of a game: their own cards only, or none if they aren't seated"""
+        public_view = self._create_public_view(game_state)
+        hands = game_state.get('hands', {})
+        if username in hands:
+            return self._create_player_view(public_view, hands, username)
+        return public_view
+    
+    def _create_public_view(self, game_state: Dict[str, Any]) -> Dict[str, Any]:
+        """The game state with every player's cards replaced by hidden values"""
+        hidden = {player: ["??"] * len(cards) for player, cards in game_state.get('hands', {}).items()}
+        return {**game_state, 'hands': hidden}
+    
+    def _create_player_view(self, public_view: Dict[str, Any], hands: Dict[str, List[str]], username: str) -> Dict[str, Any]:
+        """Create a player-specific view: the public view with only their own cards revealed"""
+        own_hands = dict(public_view['hands'])
+        own_hands[username] = hands[username]
+        return {**public_view, 'hands': own_hands}
 
 
 # Create a singleton instance
@@ -1,56 +1,75 @@
-from fastapi import WebSocket, WebSocketDisconnect, Depends
+from fastapi import WebSocket, WebSocketDisconnect
+from sqlalchemy import literal
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session
-import json
+import orjson
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
 
 from .connection_manager import connection_manager
 from .. import models, database
-from ..poker_logic import PokerGame
-from ..ml_models.poker_model import PokerAIModel
+from ..poker_logic import PokerGame, apply_action, decide_winner
+from ..game_store import active_games, get_live_game, game_lock, evict_game, older_state, previous_state
+from ..ml_models.poker_model import get_model
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Initialize ML model for AI decisions
-ai_model = PokerAIModel()
+ai_model = get_model()
+
+# The only parts of the state a fold/call/raise can change; the cards stay put
+BETTING_KEYS = ('pot', 'current_bet', 'active_players', 'bets', 'version')
 
 async def handle_websocket_connection(
     websocket: WebSocket, 
     game_id: str, 
-    username: str,
-    db: Session = Depends(database.SessionLocal)
+    username: str
 ):
-    """Handle a new WebSocket connection for a game"""
+    """
+    Handle a new WebSocket connection for a game
+
+    Clients should send JSON messages as binary frames (text frames are
+    accepted too). Every server frame is a binary JSON array of messages
+    behind a one byte header: 0x00 plain, 0x01 zlib-compressed
+
+    Database sessions are opened per message rather than per connection, so
+    an idle socket never holds a pooled DB connection
+    """
     try:
         # Accept connection and register in connection manager
         await connection_manager.connect(websocket, game_id, username)
         
         # Get initial game state and send to the new player
-        game = db.query(models.Game).filter(models.Game.id == int(game_id)).first()
-        if game:
-            game_state = json.loads(game.state)
+        with database.SessionLocal() as db:
+            poker_game = await load_game(db, int(game_id))
+        if poker_game:
             await connection_manager.send_personal_message(
                 username, 
                 {
                     "type": "initial_state",
-                    "state": game_state
+                    # Opponents' hole cards stay hidden, as in every later update
+                    "state": connection_manager.view_for(poker_game.to_dict(), username)
                 }
             )
         
         # Main WebSocket message handling loop
         while True:
-            # Wait for messages from the client
-            message_json = await websocket.receive_text()
-            message = json.loads(message_json)
+            # Wait for messages from the client; binary frames skip UTF-8 decoding,
+            # text frames are still accepted from clients that send them
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            message = orjson.loads(frame.get("bytes") or frame.get("text"))
             
             # Process different message types
             message_type = message.get("type", "")
             
             if message_type == "player_action":
                 # Handle player actions (fold, call, raise)
-                await handle_player_action(db, game_id, username, message)
+                with database.SessionLocal() as db:
+                    await handle_player_action(db, game_id, username, message)
             
             elif message_type == "chat":
                 # Handle chat messages
@@ -58,17 +77,25 @@ async def handle_websocket_connection(
             
             elif message_type == "game_control":
                 # Handle game control messages (flop, turn, river, etc.)
-                await handle_game_control(db, game_id, username, message)
+                with database.SessionLocal() as db:
+                    await handle_game_control(db, game_id, username, message)
                 
     except WebSocketDisconnect:
         # Handle disconnect
-        connection_manager.disconnect(websocket, username)
-        logger.info(f"Client {username} disconnected from game {game_id}")
+        await connection_manager.disconnect(websocket, username)
+        logger.info("Client %s disconnected from game %s", username, game_id)
         
     except Exception as e:
         # Log any other errors
-        logger.error(f"Error in WebSocket handler: {str(e)}")
-        connection_manager.disconnect(websocket, username)
+        logger.exception("Error in WebSocket handler: %s", e)
+        await connection_manager.disconnect(websocket, username)
+
+async def load_game(db: Session, game_id: int) -> Optional[PokerGame]:
+    """The live game; only a cache miss touches the database, on a worker thread"""
+    poker_game = active_games.get(game_id)
+    if poker_game is None:
+        poker_game = await asyncio.to_thread(get_live_game, game_id, db)
+    return poker_game
 
 async def handle_player_action(
     db: Session, 
@@ -79,67 +106,54 @@ async def handle_player_action(
     """Handle a player action (fold, call, raise)"""
     action = message.get("action")
     amount = message.get("amount")
-    logger.info(f"Player {username} action: {action} amount: {amount}")
+    logger.debug("Player %s action: %s amount: %s", username, action, amount)
     
-    # Get the game from the database
-    game = db.query(models.Game).filter(models.Game.id == int(game_id)).first()
-    if not game:
-        logger.error(f"Game {game_id} not found")
+    # Get the live game, loading it from the database only if it isn't cached
+    poker_game = await load_game(db, int(game_id))
+    if not poker_game:
+        logger.error("Game %s not found", game_id)
         return
     
-    # Parse the current game state
-    game_state = json.loads(game.state)
-    poker_game = create_poker_game_from_state(game_state)
-    
-    # Verify player is active
-    if username not in poker_game.active_players:
-        logger.error(f"Player {username} is not active in the game")
-        return
-    
-    # Process the action
-    if action == 'fold':
-        poker_game.active_players.remove(username)
-    elif action == 'call':
-        bet = poker_game.current_bet - poker_game.bets[username]
-        poker_game.bets[username] += bet
-        poker_game.pot += bet
-    elif action == 'raise':
-        if amount is None or amount <= poker_game.current_bet:
-            logger.error(f"Invalid raise amount: {amount}")
+    # Mutate and snapshot under the game's lock; no awaits until it is released
+    with game_lock(int(game_id)):
+        # Verify player is active
+        if not poker_game.is_active(username):
+            logger.error("Player %s is not active in the game", username)
             return
-        bet = amount - poker_game.bets[username]
-        poker_game.current_bet = amount
-        poker_game.bets[username] += bet
-        poker_game.pot += bet
-    else:
-        logger.error(f"Unknown action: {action}")
-        return
-    
-    # AI's turn - for each AI player, make a move
-    for ai_player in [p for p in poker_game.active_players if p.startswith('ai')]:
-        ai_decision = ai_model.predict_action(poker_game.to_dict(), ai_player)
-        ai_action = ai_decision['action']
-        ai_amount = ai_decision['amount']
         
-        # Process AI action
-        if ai_action == 'fold':
-            poker_game.active_players.remove(ai_player)
-        elif ai_action == 'call':
-            bet = poker_game.current_bet - poker_game.bets[ai_player]
-            poker_game.bets[ai_player] += bet
-            poker_game.pot += bet
-        elif ai_action == 'raise' and ai_amount is not None:
-            bet = ai_amount - poker_game.bets[ai_player]
-            poker_game.current_bet = ai_amount
-            poker_game.bets[ai_player] += bet
-            poker_game.pot += bet
+        # Process the action
+        try:
+            apply_action(poker_game, username, action, amount)
+        except ValueError as e:
+            logger.error("%s: %s %s", e, action, amount)
+            return
+        
+        # AI's turn - decide for every AI player in one model call, then apply in seat order
+        ai_players = [p for p in poker_game.active_players if p.startswith('ai')]
+        if ai_players:
+            ai_decisions = ai_model.predict_actions_batch(poker_game.to_dict(), ai_players)
+            for ai_player, ai_decision in zip(ai_players, ai_decisions):
+                try:
+                    apply_action(poker_game, ai_player, ai_decision['action'], ai_decision['amount'])
+                except ValueError as e:
+                    logger.error("Ignoring AI action for %s: %s", ai_player, e)
+        
+        # Check for game end conditions
+        game_over = poker_game.active_count <= 1 or len(poker_game.community) == 5
+        winners, pot_per_winner = settle_game(poker_game) if game_over else ([], 0.0)
+        
+        # Serialize once: the same snapshot is saved and broadcast
+        state = poker_game.snapshot()
     
-    # Update game state in database
-    game.state = json.dumps(poker_game.to_dict())
-    db.commit()
+    # Save the game state and any payouts in one transaction, off the event loop;
+    # unless the hand ended (which can run out the board) only the betting keys changed
+    changed = None if game_over else BETTING_KEYS
+    await asyncio.to_thread(commit_game, db, game_id, state, winners, pot_per_winner, changed)
+    if game_over:
+        evict_game(int(game_id))
     
     # Broadcast the updated game state to all players
-    await connection_manager.update_game_state(game_id, poker_game.to_dict())
+    await connection_manager.update_game_state(game_id, state)
     
     # Also broadcast the last action to everyone
     await connection_manager.broadcast_to_table(
@@ -152,9 +166,8 @@ async def handle_player_action(
         }
     )
     
-    # Check for game end conditions
-    if len(poker_game.active_players) <= 1 or len(poker_game.community) == 5:
-        await check_game_end(db, game_id, poker_game)
+    if game_over:
+        await announce_game_end(game_id, poker_game, winners, pot_per_winner)
 
 async def handle_chat_message(game_id: str, username: str, message: Dict[str, Any]):
     """Handle a chat message"""
@@ -181,38 +194,44 @@ async def handle_game_control(
 ):
     """Handle game control messages (flop, turn, river)"""
     command = message.get("command", "")
-    logger.info(f"Game control: {command} by {username} in game {game_id}")
+    logger.debug("Game control: %s by %s in game %s", command, username, game_id)
     
-    # Get the game from the database
-    game = db.query(models.Game).filter(models.Game.id == int(game_id)).first()
-    if not game:
-        logger.error(f"Game {game_id} not found")
+    # Get the live game, loading it from the database only if it isn't cached
+    poker_game = await load_game(db, int(game_id))
+    if not poker_game:
+        logger.error("Game %s not found", game_id)
         return
     
-    # Parse the game state
-    game_state = json.loads(game.state)
-    poker_game = create_poker_game_from_state(game_state)
-    
-    # Process the command
-    if command == "flop" and len(poker_game.community) == 0:
-        poker_game.flop()
-    elif command == "turn" and len(poker_game.community) == 3:
-        poker_game.turn()
-    elif command == "river" and len(poker_game.community) == 4:
-        poker_game.river()
-    elif command == "showdown":
-        # Will be handled by check_game_end
-        pass
-    else:
-        logger.error(f"Invalid game control command: {command}")
-        return
+    # Mutate and snapshot under the game's lock; no awaits until it is released
+    with game_lock(int(game_id)):
+        # Process the command
+        if command == "flop" and len(poker_game.community) == 0:
+            poker_game.flop()
+        elif command == "turn" and len(poker_game.community) == 3:
+            poker_game.turn()
+        elif command == "river" and len(poker_game.community) == 4:
+            poker_game.river()
+        elif command == "showdown":
+            # Will be handled by settle_game
+            pass
+        else:
+            logger.error("Invalid game control command: %s", command)
+            return
+        
+        # Check for game end if showdown or all but one player has folded
+        game_over = command == "showdown" or poker_game.active_count <= 1
+        winners, pot_per_winner = settle_game(poker_game) if game_over else ([], 0.0)
+        
+        # Serialize once: the same snapshot is saved and broadcast
+        state = poker_game.snapshot()
     
-    # Update game state in database
-    game.state = json.dumps(poker_game.to_dict())
-    db.commit()
+    # Save the game state and any payouts in one transaction, off the event loop
+    await asyncio.to_thread(commit_game, db, game_id, state, winners, pot_per_winner)
+    if game_over:
+        evict_game(int(game_id))
     
     # Broadcast the updated game state
-    await connection_manager.update_game_state(game_id, poker_game.to_dict())
+    await connection_manager.update_game_state(game_id, state)
     
     # Also broadcast the game stage update
     await connection_manager.broadcast_to_table(
@@ -220,38 +239,68 @@ async def handle_game_control(
         {
             "type": "game_stage_update",
             "stage": command,
-            "community_cards": [str(c) for c in poker_game.community]
+            "community_cards": state["community"]
         }
     )
     
-    # Check for game end if showdown or all but one player has folded
-    if command == "showdown" or len(poker_game.active_players) <= 1:
-        await check_game_end(db, game_id, poker_game)
+    if game_over:
+        await announce_game_end(game_id, poker_game, winners, pot_per_winner)
 
-async def check_game_end(db: Session, game_id: str, poker_game: PokerGame):
-    """Check if the game has ended and determine the winner"""
-    from ..poker_logic import decide_winner
-    
+def commit_game(
+    db: Session,
+    game_id: str,
+    state: Dict[str, Any],
+    winners: List[str],
+    pot_per_winner: float,
+    changed: Optional[Tuple[str, ...]] = None
+):
+    """
+    Write the game state and credit any winners in one transaction.
+    With changed, only those top-level keys are sent and merged into the
+    stored JSONB (state || patch), but only onto the version right before
+    this one; if the row is anywhere else (an earlier full write still in
+    flight) the whole document is written instead. A state older than the
+    stored one is not written at all.
+    Blocking, so the handlers run it with asyncio.to_thread
+    """
+    version = state['version']
+    game = db.query(models.Game).filter(models.Game.id == int(game_id))
+    patched = 0
+    if changed:
+        patch = {key: state[key] for key in changed}
+        patched = game.filter(previous_state(version)).update(
+            {models.Game.state: models.Game.state.op('||')(literal(patch, type_=JSONB))},
+            synchronize_session=False
+        )
+    if not patched:
+        game.filter(older_state(version)).update(
+            {models.Game.state: state},
+            synchronize_session=False
+        )
+    if winners:
+        # Credit every winner with one UPDATE
+        db.query(models.User).filter(models.User.username.in_(winners)).update(
+            {models.User.credits: models.User.credits + pot_per_winner},
+            synchronize_session=False
+        )
+    db.commit()
+
+def settle_game(poker_game: PokerGame) -> Tuple[List[str], float]:
+    """Determine the winners and their share of the pot; commit_game pays them out"""
     # If only one player is active, they win automatically
-    if len(poker_game.active_players) == 1:
-        winner = list(poker_game.active_players)[0]
+    if poker_game.active_count == 1:
+        winner = poker_game.active_players[0]
         winners = [winner]
     else:
-        # Otherwise determine winner based on hands
+        # Otherwise complete the board and determine winner based on hands
+        poker_game.run_out()
         winners = decide_winner(poker_game)
     
-    # Split the pot among winners
-    pot_per_winner = poker_game.pot / len(winners)
-    
-    # Update user credits in database
-    for winner in winners:
-        # Find the user by username
-        user = db.query(models.User).filter(models.User.username == winner).first()
-        if user:
-            user.credits += pot_per_winner
-            db.commit()
-    
-    # Broadcast the game result
+    # Split the pot among winners (nobody left if every seat folded)
+    return winners, poker_game.pot / len(winners) if winners else 0.0
+
+async def announce_game_end(game_id: str, poker_game: PokerGame, winners: List[str], pot_per_winner: float):
+    """Broadcast the game result"""
     await connection_manager.broadcast_to_table(
         game_id,
         {
@@ -261,21 +310,3 @@ async def check_game_end(db: Session, game_id: str, poker_game: PokerGame):
             "final_state": poker_game.to_dict()
         }
     )
-
-def create_poker_game_from_state(game_state: Dict[str, Any]) -> PokerGame:
-    """Create a PokerGame instance from a JSON game state"""
-    from ..poker_logic import Card, PokerGame
-    
-    # Create the poker game
-    poker_game = PokerGame(game_state['players'])
-    
-    # Restore the game state
-    poker_game.hands = {p: [Card(c[-1], c[:-1]) for c in game_state['hands'][p]] 
-                        for p in game_state['players']}
-    poker_game.community = [Card(c[-1], c[:-1]) for c in game_state['community']]
-    poker_game.pot = game_state['pot']
-    poker_game.current_bet = game_state['current_bet']
-    poker_game.active_players = set(game_state['active_players'])
-    poker_game.bets = game_state['bets']
-    
-    return poker_game
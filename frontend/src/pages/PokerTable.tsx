@@ -39,7 +39,7 @@ const PokerTable: React.FC = () => {
     try {
       setIsLoading(true);
       const response = await axios.get(`http://localhost:8000/games/${tableId}`);
-      const state = JSON.parse(response.data.state);
+      const state = response.data.state;
       setGameState(state);
       setError('');
     } catch (err: any) {